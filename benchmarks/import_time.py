@@ -0,0 +1,49 @@
+""" import_time.py
+ - Cold-start import benchmark: every measurement starts a fresh interpreter, like a new worker process does
+    - For each module it reports the median import time over a few runs and whether pygame or the Gemini SDK got imported along with it
+    - The engine modules (connect_four, game.board, simulation, tournament) and main/game.gemini should load
+      neither; pygame and google.generativeai are timed on their own to show what they would add
+    - Run from the repository root:
+        python benchmarks/import_time.py
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MODULES = ["connect_four", "game.board", "simulation", "tournament", "game.gemini", "main"]
+HEAVY_MODULES = ["pygame", "google.generativeai"]
+RUNS = 7
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "pygame": "pygame" in sys.modules,
+                   "gemini_sdk": "google.generativeai" in sys.modules}}))
+"""
+
+def measure(module: str, runs: int = RUNS):
+    # - Returns (median import seconds, last probe result), None if the module can't be imported
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    imports, result = [], None
+    for _ in range(runs):
+        process = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], cwd=root,
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            return None
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        imports.append(result["seconds"])
+    return statistics.median(imports), result
+
+if __name__ == "__main__":
+    print(f"{'Module':<22} {'Import (ms)':>12} {'pygame':>8} {'Gemini SDK':>11}")
+    for module in MODULES + HEAVY_MODULES:
+        measured = measure(module)
+        if measured is None:
+            print(f"{module:<22} {'not installed / failed':>33}")
+            continue
+        seconds, result = measured
+        print(f"{module:<22} {seconds * 1000:>12.1f} {str(result['pygame']):>8} {str(result['gemini_sdk']):>11}")
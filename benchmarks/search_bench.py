@@ -0,0 +1,233 @@
+""" search_bench.py
+ - Search engine benchmark on a fixed corpus of positions, with a JSON baseline to catch speed and correctness regressions
+    - CORPUS holds openings, middlegames, tactical positions (a forced win to find, or one threat that must be blocked)
+      and near-endgames, written as the columns played from the empty board (1-7, player 1 first). A tactical position
+      lists every move that keeps the forced win or blocks the threat (checked with a depth 8 Alpha-Beta search)
+    - ENGINES are MinimaxAgent configurations: plain Minimax, Alpha-Beta, the fast Alpha-Beta (bitboard, in-place,
+      incremental evaluation, transposition table, full move ordering), negamax/PVS and the exact endgame solver
+    - Every engine searches every position of its categories at each of its fixed depths, and the iterative deepening
+      engines also within each time budget. A fresh agent is used for every search, so node counts are reproducible
+    - Reported per engine and setting: nodes, time (best of --repeat runs), nodes per second, time to depth
+      (the depth reached in a time budget), agreement of the best move with plain Alpha-Beta at the same depth
+      and the tactical positions answered with one of their expected moves
+    - --out writes every result to a JSON file, --compare diffs this run against such a file:
+        - a different move or node count at a fixed depth is a correctness regression (those searches are deterministic)
+        - a tactical position answered with none of its expected moves is a correctness regression
+        - an engine/setting whose total time grew by more than --tolerance is a speed regression
+      and the script exits with status 1 if there is any, so it can gate a change
+    - Run from the repository root:
+        python benchmarks/search_bench.py --out baseline.json
+        python benchmarks/search_bench.py --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connect_four import MinimaxAgent, initialize_board
+from game.board import Board
+
+BENCHMARK_VERSION = 2
+
+# - name: (category, columns played from the empty board (1-based), expected moves (1-based) or None)
+CORPUS = {
+    "empty": ("opening", "", None),
+    "center": ("opening", "4", None),
+    "center-stack": ("opening", "44", None),
+    "open-4453": ("opening", "4453", None),
+    "open-3344": ("opening", "3344", None),
+    "open-445566": ("opening", "445566", None),
+    "mid-3636642341": ("middlegame", "3636642341", None),
+    "mid-5421226365": ("middlegame", "5421226365", None),
+    "mid-4761722561": ("middlegame", "4761722561", None),
+    "mid-6637176321142413": ("middlegame", "6637176321142413", None),
+    "mid-1751771772574316": ("middlegame", "1751771772574316", None),
+    "mid-423311342562122773": ("middlegame", "423311342562122773", None),
+    "win-17254313534": ("tactical", "17254313534", (3,)),
+    "win-546217136112727": ("tactical", "546217136112727", (2, 3, 4, 5)),
+    "win-527434722154263": ("tactical", "527434722154263", (4, 6)),
+    "block-27336546737": ("tactical", "27336546737", (1,)),
+    "block-227274711636222": ("tactical", "227274711636222", (7,)),
+    "block-234343344331725": ("tactical", "234343344331725", (6,)),
+    "end-76265713721773555445411115": ("endgame", "76265713721773555445411115", None),
+    "end-6127452223716622151634643156": ("endgame", "6127452223716622151634643156", None),
+    "end-644377227424721142536676672431": ("endgame", "644377227424721142536676672431", None),
+    "end-2551346332621523521516265731": ("endgame", "2551346332621523521516265731", None),
+}
+
+ALL_CATEGORIES = ("opening", "middlegame", "tactical", "endgame")
+FAST = {"use_alpha_beta": True, "use_bitboard": True, "in_place": True, "incremental_eval": True,
+        "use_transposition": True, "ordering": "all"}
+
+# - name: (MinimaxAgent options, fixed depths, time budgets in ms, categories)
+ENGINES = {
+    "minimax": ({}, (2, 4), (), ALL_CATEGORIES),
+    "alpha-beta": ({"use_alpha_beta": True}, (2, 4, 6), (), ALL_CATEGORIES),
+    "alpha-beta-fast": (FAST, (4, 6, 8), (100, 500), ALL_CATEGORIES),
+    "negamax": (dict(FAST, use_negamax=True), (4, 6, 8), (100, 500), ALL_CATEGORIES),
+    "solver": ({"use_alpha_beta": True, "solve_below": 43, "solve_time_ms": None}, (4,), (), ("endgame",)),
+}
+REFERENCE_ENGINE = "alpha-beta"
+
+def load_position(moves: str):
+    board = Board()
+    player = 1
+    for column in moves:
+        col = int(column) - 1
+        board.drop_piece(board.get_next_open_row(col), col, player)
+        player = 2 if player == 1 else 1
+    return board, player
+
+def run_search(options: Dict, moves: str, depth: Optional[int], budget_ms: Optional[int], repeat: int) -> Dict:
+    # - Best time of repeat runs, nodes and move are the same in every run of a fixed-depth search
+    best = None
+    for _ in range(repeat):
+        board, player = load_position(moves)
+        if budget_ms is None:
+            agent = MinimaxAgent(max_depth=depth, **options)
+        else:
+            agent = MinimaxAgent(max_depth=board.rows * board.columns, time_limit_ms=budget_ms, **options)
+        start = time.perf_counter()
+        move, nodes = agent.get_move(initialize_board(board, player))
+        seconds = time.perf_counter() - start
+        agent.close()
+        if best is None or seconds < best["seconds"]:
+            best = {"move": None if move is None else move + 1, "nodes": nodes, "seconds": seconds, "depth": agent.last_depth}
+    return best
+
+def run_benchmark(engines: List[str], categories: List[str], repeat: int = 3, budgets: bool = True) -> List[Dict]:
+    results = []
+    for engine in engines:
+        options, depths, time_budgets, engine_categories = ENGINES[engine]
+        settings = [("depth", depth) for depth in depths] + ([("budget_ms", budget) for budget in time_budgets] if budgets else [])
+        for kind, setting in settings:
+            for name, (category, moves, expected) in CORPUS.items():
+                if category not in categories or category not in engine_categories:
+                    continue
+                if kind == "depth":
+                    result = run_search(options, moves, setting, None, repeat)
+                else:
+                    # - A timed search is only run once, its node count and move depend on the machine anyway
+                    result = run_search(options, moves, None, setting, 1)
+                result.update({"engine": engine, kind: setting, "position": name, "category": category, "expected": expected})
+                results.append(result)
+                print(f"{engine:<16} {kind}={setting:<5} {name:<36} move {result['move']} "
+                      f"{result['nodes']:>9} nodes {result['seconds']:>8.3f}s", file=sys.stderr)
+    return results
+
+def setting_label(result: Dict) -> str:
+    return f"depth {result['depth']}" if "budget_ms" not in result else f"{result['budget_ms']} ms"
+
+def result_key(result: Dict):
+    return result["engine"], "budget_ms" if "budget_ms" in result else "depth", \
+        result.get("budget_ms", result["depth"]), result["position"]
+
+def summarize(results: List[Dict]) -> List[Dict]:
+    # - One row per engine and setting
+    reference = {(result["depth"], result["position"]): result["move"] for result in results
+                 if result["engine"] == REFERENCE_ENGINE and "budget_ms" not in result}
+    rows: Dict[tuple, Dict] = {}
+    for result in results:
+        key = result_key(result)[:3]
+        row = rows.setdefault(key, {"engine": result["engine"], "setting": setting_label(result), "positions": 0,
+                                    "nodes": 0, "seconds": 0.0, "agree": 0, "compared": 0, "tactics": 0,
+                                    "tactics_found": 0, "depths": []})
+        row["positions"] += 1
+        row["nodes"] += result["nodes"]
+        row["seconds"] += result["seconds"]
+        if "budget_ms" in result:
+            row["depths"].append(result["depth"] or 0)
+        elif (result["depth"], result["position"]) in reference:
+            row["compared"] += 1
+            row["agree"] += result["move"] == reference[(result["depth"], result["position"])]
+        if result["expected"] is not None:
+            row["tactics"] += 1
+            row["tactics_found"] += result["move"] in result["expected"]
+    for row in rows.values():
+        row["nodes_per_second"] = row["nodes"] / row["seconds"] if row["seconds"] else 0.0
+        row["mean_depth"] = sum(row["depths"]) / len(row["depths"]) if row["depths"] else None
+        del row["depths"]
+    return list(rows.values())
+
+def print_summary(summary: List[Dict]):
+    print(f"{'Engine':<16} {'Setting':<10} {'Nodes':>10} {'Time (s)':>9} {'Nodes/s':>10} {'Depth':>6} "
+          f"{'Agree':>7} {'Tactics':>8}")
+    for row in summary:
+        depth = f"{row['mean_depth']:.1f}" if row["mean_depth"] is not None else "-"
+        agree = f"{row['agree']}/{row['compared']}" if row["compared"] else "-"
+        tactics = f"{row['tactics_found']}/{row['tactics']}" if row["tactics"] else "-"
+        print(f"{row['engine']:<16} {row['setting']:<10} {row['nodes']:>10} {row['seconds']:>9.3f} "
+              f"{row['nodes_per_second']:>10.0f} {depth:>6} {agree:>7} {tactics:>8}")
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    # - Returns one line per regression against the baseline run
+    regressions = []
+    old_results = {result_key(result): result for result in baseline["results"]}
+    for result in results:
+        old = old_results.get(result_key(result))
+        if result["expected"] is not None and result["move"] not in result["expected"] \
+                and (old is None or old["move"] in old["expected"]):
+            expected = " or ".join(str(move) for move in result["expected"])
+            regressions.append(f"{result['engine']} {setting_label(result)} {result['position']}: "
+                               f"played {result['move']}, expected {expected}")
+        if old is None or "budget_ms" in result:
+            continue
+        if result["move"] != old["move"] or result["nodes"] != old["nodes"]:
+            regressions.append(f"{result['engine']} {setting_label(result)} {result['position']}: move {old['move']} -> "
+                               f"{result['move']}, nodes {old['nodes']} -> {result['nodes']}")
+
+    old_summary = {(row["engine"], row["setting"]): row for row in baseline["summary"]}
+    for row in summarize(results):
+        old = old_summary.get((row["engine"], row["setting"]))
+        if old is None or old["positions"] != row["positions"] or not old["seconds"]:
+            continue
+        ratio = row["seconds"] / old["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append(f"{row['engine']} {row['setting']}: {old['seconds']:.3f}s -> {row['seconds']:.3f}s "
+                               f"({ratio - 1:+.0%})")
+        elif ratio < 1 - tolerance:
+            print(f"faster: {row['engine']} {row['setting']}: {old['seconds']:.3f}s -> {row['seconds']:.3f}s ({ratio - 1:+.0%})")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the search engines on a fixed corpus of positions")
+    parser.add_argument("--engines", nargs="+", choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument("--categories", nargs="+", choices=ALL_CATEGORIES, default=list(ALL_CATEGORIES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per fixed-depth search, the fastest one counts")
+    parser.add_argument("--no-budgets", action="store_true", help="skip the time-budget searches")
+    parser.add_argument("--out", help="write the results to this JSON file (the baseline for --compare)")
+    parser.add_argument("--compare", help="baseline JSON file to diff this run against, exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per engine and setting (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.engines, args.categories, args.repeat, not args.no_budgets)
+    summary = summarize(results)
+    print_summary(summary)
+
+    if args.out:
+        with open(args.out, mode='w') as file:
+            json.dump({
+                "version": BENCHMARK_VERSION,
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "summary": summary,
+                "results": results,
+            }, file, indent=1)
+        print(f"Wrote {len(results)} results to {args.out}")
+
+    if args.compare:
+        with open(args.compare, mode='r') as file:
+            baseline = json.load(file)
+        if baseline.get("version") != BENCHMARK_VERSION:
+            sys.exit(f"{args.compare} was written by a different version of the benchmark")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regressions against {args.compare}")
+        sys.exit(1 if regressions else 0)
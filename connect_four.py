@@ -5,8 +5,16 @@
  - The Minimax agent has a method to get the best move based on the current game state
  - The Minimax agent has a method to evaluate the board and assign scores to different game states
 """
-from game.board import Board, check_win as board_check_win
-import math, copy
+from game.board import Board, check_win as board_check_win, check_win_at as board_check_win_at, get_windows
+from game.bitboard import BitBoard
+from game.transposition import TranspositionTable, SolverCache, get_zobrist_keys, canonical_key, EXACT, LOWER, UPPER
+from game.ordering import make_ordering, center_first
+from game.opening_book import OpeningBook
+from game.instrumentation import SearchProfile
+from functools import lru_cache
+import math, copy, time, random
+import multiprocessing
+import threading
 
 def initialize_board(board=Board(), current_player=1):
     # Create a new Board instance instead of a raw list
@@ -27,15 +35,71 @@ def make_move(state, column):
     if row is None:
         raise ValueError(f"Column {column} is full. Invalid move.")
     
+    # Winner before this move (computed once for a fresh state, cached afterwards)
+    previous_winner = check_win(state)
+    piece = state['current_player']
+
     # Drop the piece for the current player
-    board.drop_piece(row, column, state['current_player'])
+    board.drop_piece(row, column, piece)
+    # Remember the move so undo_move can take it back
+    state.setdefault('undo_stack', []).append((row, column, previous_winner))
+    # Keep the Zobrist hash and the evaluation counts in step with the board when the search uses them
+    if 'hash' in state:
+        keys = get_zobrist_keys(board.rows, board.columns)
+        state['hash'] ^= keys.move_key(row, column, piece)
+        # Only the exact solver's state has the mirror hash, for its canonical key
+        if 'mirror_hash' in state:
+            state['mirror_hash'] ^= keys.move_key(row, board.columns - 1 - column, piece)
+    if 'window_keys' in state:
+        update_evaluation(state, row, column, piece, 1)
+    # Only lines through the new piece can have changed, so the winner is updated from the last move
+    if previous_winner is None and won_by_move(board, row, column, piece):
+        state['winner'] = piece
+    else:
+        state['winner'] = previous_winner
     # Switch current player
+    state['current_player'] = 2 if piece == 1 else 1
+    return state
+
+def undo_move(state):
+    # Take back the last move played with make_move
+    row, column, previous_winner = state['undo_stack'].pop()
+    board = state['board']
+    board.remove_piece(row, column)
+    state['winner'] = previous_winner
     state['current_player'] = 2 if state['current_player'] == 1 else 1
+    if 'hash' in state:
+        keys = get_zobrist_keys(board.rows, board.columns)
+        state['hash'] ^= keys.move_key(row, column, state['current_player'])
+        if 'mirror_hash' in state:
+            state['mirror_hash'] ^= keys.move_key(row, board.columns - 1 - column, state['current_player'])
+    if 'window_keys' in state:
+        update_evaluation(state, row, column, state['current_player'], -1)
     return state
 
+def won_by_move(board, row, column, piece):
+    # Check only the lines through the piece that was just dropped at (row, column)
+    if isinstance(board, BitBoard):
+        # The whole-mask test is a few shifts, already cheaper than walking the lines
+        return board.has_won(piece)
+    return board_check_win_at(board, row, column, piece)
+
 def check_win(state):
-    # Check for 4-in-a-row for both players
-    board = state['board']
+    # make_move keeps state['winner'] up to date, so the full scan only runs once for a fresh state
+    if 'winner' in state:
+        return state['winner']
+    state['winner'] = scan_winner(state['board'])
+    return state['winner']
+
+def scan_winner(board):
+    # Check for connect-in-a-row (4 for Connect 4) for both players
+    if isinstance(board, BitBoard):
+        # Shift-and-AND test on the player masks
+        if board.has_won(1):
+            return 1
+        if board.has_won(2):
+            return 2
+        return None
     if board_check_win(board, 1):
         return 1
     if board_check_win(board, 2):
@@ -53,59 +117,118 @@ def is_terminal(state):
     return check_win(state) is not None or is_draw(state)
 
 def check_window(window, player=1, opponent=2):
+    # The window is one line of connect cells (4 for Connect 4)
+    connect = len(window)
     player_count = window.count(player)
     opponent_count = window.count(opponent)
     empty_count = window.count(0)
 
     # Scoring strategy
-    if player_count == 4:
+    if player_count == connect:
         return 100  # Winning
-    elif player_count == 3 and empty_count == 1:
+    elif player_count == connect - 1 and empty_count == 1:
         return 5  # Potential win
-    elif player_count == 2 and empty_count == 2:
+    elif player_count == connect - 2 and empty_count == 2:
         return 2  # creating line
     
-    if opponent_count == 3 and empty_count == 1:
+    if opponent_count == connect - 1 and empty_count == 1:
         return -4  # block opponent win
     
     return 0
 
 def evaluate_board(state):
+    # Kept up to date by make_move/undo_move once init_evaluation has been called on the state
+    if 'eval_totals' in state:
+        return state['eval_totals'][state['current_player']]
+
     board = state['board']
-    total_score = 0
+    # Read the grid once, a BitBoard builds it on every access
+    grid = board.grid
     player = state['current_player']
-    opponent = 2 if player == 1 else 2
-
-    # - horizontal
-    for row_index in range(board.rows):
-        for col_index in range(board.columns - 3):
-            window = [board.grid[row_index][col_index + i] for i in range(4)]
-            total_score += check_window(window, player, opponent)
-            
-    # - vertical
-    for col_index in range(board.columns):
-        for row_index in range(board.rows - 3):
-            window = [board.grid[row_index + i][col_index] for i in range(4)]
-            total_score += check_window(window, player, opponent)
-
-    # - diagonal, south west to north-east
-    for row_index in range(board.rows - 3):
-        for col_index in range(board.columns - 3):
-            window = [board.grid[row_index + i][col_index + i] for i in range(4)]
-            total_score += check_window(window, player, opponent)
-
-    # - diagonal, north-west to south east
-    for row_index in range(3, board.rows):
-        for col_index in range(board.columns - 3):
-            window = [board.grid[row_index - i][col_index - i] for i in range(4)]
-            total_score += check_window(window, player, opponent)
-
+    # The windows and their scores come from tables built once per board size
+    windows, _, key_step, scores = get_eval_tables(board.rows, board.columns, board.connect)
+    scores = scores[player]
+    total_score = 0
+    for window in windows:
+        key = 0
+        for row, col in window:
+            key += key_step[grid[row][col]]
+        total_score += scores[key]
     return total_score
 
+def build_window_scores(connect=4):
+    # scores[current_player][key] is what check_window gives a window with that key.
+    # Window key: connect + 1 per player 1 disc plus 1 per player 2 disc, so every (player 1 count, player 2 count)
+    # pair is one small int. evaluate_board has always scored against opponent=2, so that is kept here as well
+    scores = [None]
+    for player in (1, 2):
+        table = []
+        for player_one_count in range(connect + 1):
+            for player_two_count in range(connect + 1):
+                empty_count = connect - player_one_count - player_two_count
+                if empty_count < 0:
+                    table.append(0)
+                    continue
+                window = [1] * player_one_count + [2] * player_two_count + [0] * empty_count
+                table.append(check_window(window, player, 2))
+        scores.append(table)
+    return scores
+
+@lru_cache(maxsize=None)
+def get_eval_tables(rows, columns, connect=4):
+    # The windows scored by evaluate_board as (row, col) cells, for every cell the windows that contain it,
+    # the key step per piece and the window scores, built once per geometry.
+    # These are the lines of game.board.get_windows, except the last group: for the lines that start at
+    # (row, col) and go up to the right, the original evaluate_board read grid[row - i][col - i], going up to the
+    # left, where a negative column wraps around to the right edge of the grid. The table keeps those windows so
+    # the scores stay identical (and the evaluation is not left-right symmetric)
+    lines = get_windows(rows, columns, connect)
+    wrapped = (rows - connect + 1) * (columns - connect + 1)
+    windows = list(lines[:len(lines) - wrapped])
+    for line in lines[len(lines) - wrapped:]:
+        start_col = line[0][1]
+        windows.append(tuple((row, (start_col - i) % columns) for i, (row, _) in enumerate(line)))
+
+    cell_windows = [[[] for _ in range(columns)] for _ in range(rows)]
+    for index, window in enumerate(windows):
+        for row, col in window:
+            cell_windows[row][col].append(index)
+    cell_windows = tuple(tuple(tuple(indexes) for indexes in row) for row in cell_windows)
+    key_step = (0, connect + 1, 1)
+    return tuple(windows), cell_windows, key_step, build_window_scores(connect)
+
+def init_evaluation(state):
+    # Count the discs of each window once, make_move and undo_move keep the counts and totals up to date
+    board = state['board']
+    grid = board.grid
+    windows, _, key_step, scores = get_eval_tables(board.rows, board.columns, board.connect)
+    keys = [sum(key_step[grid[row][col]] for row, col in window) for window in windows]
+    state['window_keys'] = keys
+    # eval_totals[current_player] is evaluate_board's score for that player to move
+    state['eval_totals'] = [0, sum(scores[1][key] for key in keys), sum(scores[2][key] for key in keys)]
+    return state
+
+def update_evaluation(state, row, column, piece, direction):
+    # direction is 1 when the piece is dropped and -1 when it is taken back
+    keys = state['window_keys']
+    totals = state['eval_totals']
+    board = state['board']
+    _, cell_windows, key_step, scores = get_eval_tables(board.rows, board.columns, board.connect)
+    step = key_step[piece] * direction
+    scores_one = scores[1]
+    scores_two = scores[2]
+    for index in cell_windows[row][column]:
+        old_key = keys[index]
+        new_key = old_key + step
+        keys[index] = new_key
+        totals[1] += scores_one[new_key] - scores_one[old_key]
+        totals[2] += scores_two[new_key] - scores_two[old_key]
+
 def value(state):
-    if check_win(state) == 1:
+    winner = check_win(state)
+    if winner == 1:
         return math.inf
-    if check_win(state) == 2:
+    if winner == 2:
         return -math.inf
     if is_draw(state):
         return 0
@@ -117,9 +240,12 @@ def result(state, move):
     make_move(new_state, move)
     return new_state
 
-def minimax(state, depth, maximizing_player, max_depth, node_counter=None):
+def minimax(state, depth, maximizing_player, max_depth, node_counter=None, in_place=False, stop=None):
     if node_counter is not None:
         node_counter["count"] += 1
+    # stop: a threading.Event set from another thread (e.g. the UI on quit) to abandon the search
+    if stop is not None and stop.is_set():
+        raise SearchCancelled()
     # terminal state or max depth reached
     if is_terminal(state) or depth == max_depth:
         return value(state), None
@@ -132,7 +258,13 @@ def minimax(state, depth, maximizing_player, max_depth, node_counter=None):
         best_move = None
         for move in valid_moves:
             # Recursively explore moves
-            score, _ = minimax(result(state, move), depth + 1, not maximizing_player, max_depth, node_counter)
+            if in_place:
+                # Apply the move on the shared state, search it, then take it back
+                make_move(state, move)
+                score, _ = minimax(state, depth + 1, not maximizing_player, max_depth, node_counter, in_place, stop)
+                undo_move(state)
+            else:
+                score, _ = minimax(result(state, move), depth + 1, not maximizing_player, max_depth, node_counter, stop=stop)
             if score > best_score:
                 best_score = score
                 best_move = move
@@ -144,74 +276,653 @@ def minimax(state, depth, maximizing_player, max_depth, node_counter=None):
         best_move = None
         for move in valid_moves:
             # Recursively explore moves
-            score, _ = minimax(result(state, move), depth + 1, not maximizing_player, max_depth, node_counter)
+            if in_place:
+                # Apply the move on the shared state, search it, then take it back
+                make_move(state, move)
+                score, _ = minimax(state, depth + 1, not maximizing_player, max_depth, node_counter, in_place, stop)
+                undo_move(state)
+            else:
+                score, _ = minimax(result(state, move), depth + 1, not maximizing_player, max_depth, node_counter, stop=stop)
             if score < best_score:
                 best_score = score
                 best_move = move
         return best_score, best_move
     
-def minimax_alpha_beta(state, depth, maximizing_player, max_depth, alpha, beta, node_counter=None):
+class SearchTimeout(Exception):
+    """Raised inside the search when the move's time budget runs out"""
+
+class SearchCancelled(SearchTimeout):
+    """Raised inside the search when its stop event is set, iterative deepening treats it like running out of time"""
+
+def minimax_alpha_beta(state, depth, maximizing_player, max_depth, alpha, beta, node_counter=None, in_place=False, tt=None,
+                       deadline=None, pv_hint=None, pv_line=None, ordering=None, stop=None):
+    # pv_hint: moves of the previous iteration's principal variation, searched first
+    # pv_line: if given, filled with the principal variation found by this search
+    # ordering: a game.ordering.MoveOrdering, told about every cutoff so it can learn killers and history
     if node_counter is not None:
         node_counter["count"] += 1
+    # Give up once the time budget is spent, iterative deepening keeps the last finished iteration
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise SearchTimeout()
+    if stop is not None and stop.is_set():
+        raise SearchCancelled()
     # Terminal state or max depth reached
     if is_terminal(state) or depth == max_depth:
         return value(state), None
     
     valid_moves = get_valid_moves(state)
+
+    # Transposition table lookup (needs state['hash'], see MinimaxAgent.prepare_state)
+    # Keyed on the position itself, not its canonical key: evaluate_board is not left-right symmetric (its NW-SE
+    # diagonal windows wrap around the edge of the board), so a score searched on the mirror is not a valid bound for this position
+    hash_move = None
+    if tt is not None:
+        alpha_original, beta_original = alpha, beta
+        entry = tt.probe(state['hash'])
+        if entry is not None:
+            entry_depth, flag, score, hash_move = entry
+            # The root always searches so that it returns a move from this search
+            if depth > 0 and entry_depth >= max_depth - depth:
+                if flag == EXACT:
+                    return score, hash_move
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score, hash_move
+
+    if ordering is not None:
+        valid_moves = ordering.order(state, valid_moves, depth, hash_move)
+    if hash_move in valid_moves and (ordering is None or not ordering.hash_move):
+        # Try the best move of the earlier search first, unless the ordering policy already placed it
+        valid_moves.remove(hash_move)
+        valid_moves.insert(0, hash_move)
+
+    # The principal variation of the previous iteration goes first
+    if pv_hint and pv_hint[0] in valid_moves:
+        valid_moves.remove(pv_hint[0])
+        valid_moves.insert(0, pv_hint[0])
     
     # Maximizing player (Player 1)
     if maximizing_player:
         best_score = -math.inf
         best_move = None
         for move in valid_moves:
-            score, _ = minimax_alpha_beta(result(state, move), depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter)
+            # Only the child on the previous principal variation follows the rest of it
+            child_hint = pv_hint[1:] if pv_hint and move == pv_hint[0] else None
+            child_line = [] if pv_line is not None else None
+            if in_place:
+                # Apply the move on the shared state, search it, then take it back
+                make_move(state, move)
+                score, _ = minimax_alpha_beta(state, depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter, in_place, tt, deadline, child_hint, child_line, ordering, stop)
+                undo_move(state)
+            else:
+                score, _ = minimax_alpha_beta(result(state, move), depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter, in_place, tt, deadline, child_hint, child_line, ordering, stop)
             if score > best_score:
                 best_score = score
                 best_move = move
+                if pv_line is not None:
+                    pv_line[:] = [move] + child_line
             alpha = max(alpha, best_score)
             if beta <= alpha:
+                if ordering is not None:
+                    ordering.record_cutoff(state, move, depth, max_depth - depth)
+                if node_counter is not None and "cutoffs" in node_counter:
+                    node_counter["cutoffs"][depth] += 1
                 break # Break cutoff
-        return best_score, best_move
         
     #Minimizing player (Player 2)
     else:
         best_score = math.inf
         best_move = None
         for move in valid_moves:
-            score, _ = minimax_alpha_beta(result(state, move), depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter)
+            # Only the child on the previous principal variation follows the rest of it
+            child_hint = pv_hint[1:] if pv_hint and move == pv_hint[0] else None
+            child_line = [] if pv_line is not None else None
+            if in_place:
+                # Apply the move on the shared state, search it, then take it back
+                make_move(state, move)
+                score, _ = minimax_alpha_beta(state, depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter, in_place, tt, deadline, child_hint, child_line, ordering, stop)
+                undo_move(state)
+            else:
+                score, _ = minimax_alpha_beta(result(state, move), depth + 1, not maximizing_player, max_depth, alpha, beta, node_counter, in_place, tt, deadline, child_hint, child_line, ordering, stop)
             if score < best_score:
                 best_score = score
                 best_move = move
+                if pv_line is not None:
+                    pv_line[:] = [move] + child_line
             beta = min(beta, best_score)
             if beta <= alpha:
+                if ordering is not None:
+                    ordering.record_cutoff(state, move, depth, max_depth - depth)
+                if node_counter is not None and "cutoffs" in node_counter:
+                    node_counter["cutoffs"][depth] += 1
                 break # Alpha cutoff
-        return best_score, best_move
+
+    if tt is not None:
+        # A score outside the original window is only a bound on the real value
+        if best_score <= alpha_original:
+            flag = UPPER
+        elif best_score >= beta_original:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(state['hash'], max_depth - depth, flag, best_score, best_move)
+    return best_score, best_move
+
+# Half-width of the first root window of the aspiration search, around the score of the previous search
+ASPIRATION_WINDOW = 8
+# Move ordering of the negamax engine when none is given
+NEGAMAX_ORDERING = "all"
+# Nodes with at most this many plies left search every move with the full window (no null-window searches)
+PVS_MIN_DEPTH = 2
+
+def negamax(state, depth, color, max_depth, alpha, beta, node_counter=None, in_place=False, tt=None, deadline=None, ordering=None,
+            stop=None):
+    # Negamax form of the Alpha-Beta search with principal variation search (PVS)
+    # color is 1 when player 1 is to move and -1 for player 2, scores are from the view of the player to move
+    # (color * the score minimax_alpha_beta gives), so one branch serves both players
+    if node_counter is not None:
+        node_counter["count"] += 1
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise SearchTimeout()
+    if stop is not None and stop.is_set():
+        raise SearchCancelled()
+    if is_terminal(state) or depth == max_depth:
+        return color * value(state), None
+
+    valid_moves = get_valid_moves(state)
+
+    # Transposition table lookup, same as minimax_alpha_beta but with scores from the view of the player to move
+    hash_move = None
+    if tt is not None:
+        alpha_original, beta_original = alpha, beta
+        entry = tt.probe(state['hash'])
+        if entry is not None:
+            entry_depth, flag, score, hash_move = entry
+            if depth > 0 and entry_depth >= max_depth - depth:
+                if flag == EXACT:
+                    return score, hash_move
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                elif flag == UPPER:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score, hash_move
+
+    if ordering is not None:
+        valid_moves = ordering.order(state, valid_moves, depth, hash_move)
+    if hash_move in valid_moves and (ordering is None or not ordering.hash_move):
+        valid_moves.remove(hash_move)
+        valid_moves.insert(0, hash_move)
+
+    best_score = -math.inf
+    best_move = None
+    for index, move in enumerate(valid_moves):
+        child = state
+        if in_place:
+            make_move(state, move)
+        else:
+            child = result(state, move)
+        if index == 0 or alpha == -math.inf or max_depth - depth <= PVS_MIN_DEPTH:
+            # The first move (the expected best one) gets the full window. So does every move while alpha is
+            # still -inf, since there is no null window around -inf, and every move next to the horizon,
+            # where a null window saves almost nothing and a re-search would repeat the subtree
+            score = -negamax(child, depth + 1, -color, max_depth, -beta, -alpha, node_counter, in_place, tt, deadline, ordering, stop)[0]
+        else:
+            # Null window: only proves that the move is no better than alpha (scores are integers)
+            score = -negamax(child, depth + 1, -color, max_depth, -alpha - 1, -alpha, node_counter, in_place, tt, deadline, ordering, stop)[0]
+            if alpha < score < beta and not is_terminal(child):
+                # It is better after all, search again for its exact score. The null window search returned a lower
+                # bound (fail-soft), so the window starts just below it instead of at alpha. A finished game's
+                # score is exact whatever the window, it is never searched again
+                score = -negamax(child, depth + 1, -color, max_depth, -beta, -(score - 1), node_counter, in_place, tt, deadline, ordering, stop)[0]
+        if in_place:
+            undo_move(state)
+        if score > best_score:
+            best_score = score
+            best_move = move
+        alpha = max(alpha, best_score)
+        if alpha >= beta:
+            if ordering is not None:
+                ordering.record_cutoff(state, move, depth, max_depth - depth)
+            # Only there when the agent is profiled (game.instrumentation)
+            if node_counter is not None and "cutoffs" in node_counter:
+                node_counter["cutoffs"][depth] += 1
+            break
+
+    if tt is not None:
+        if best_score <= alpha_original:
+            flag = UPPER
+        elif best_score >= beta_original:
+            flag = LOWER
+        else:
+            flag = EXACT
+        tt.store(state['hash'], max_depth - depth, flag, best_score, best_move)
+    return best_score, best_move
+
+def aspiration_search(state, max_depth, guess=None, node_counter=None, in_place=False, tt=None, deadline=None, ordering=None, stop=None):
+    # Root of the negamax engine. Scores are from player 1's view like minimax_alpha_beta, guess is the expected score
+    # (e.g. from the previous search). The root is first searched with a narrow window around guess, and again with
+    # the full window if the score falls outside of it
+    color = 1 if state['current_player'] == 1 else -1
+    if guess is not None and abs(guess) != math.inf:
+        alpha = color * guess - ASPIRATION_WINDOW
+        beta = color * guess + ASPIRATION_WINDOW
+        score, move = negamax(state, 0, color, max_depth, alpha, beta, node_counter, in_place, tt, deadline, ordering, stop)
+        if alpha < score < beta:
+            return color * score, move
+    score, move = negamax(state, 0, color, max_depth, -math.inf, math.inf, node_counter, in_place, tt, deadline, ordering, stop)
+    return color * score, move
+
+def solve(state, alpha, beta, cache, node_counter=None, deadline=None, stop=None):
+    # Exact game value for the player to move: 1 win, 0 draw, -1 loss, searched to the end of the game.
+    # Negamax Alpha-Beta on the three values with a SolverCache, needs state['hash'] and state['mirror_hash']
+    if node_counter is not None:
+        node_counter["count"] += 1
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise SearchTimeout()
+    if stop is not None and stop.is_set():
+        raise SearchCancelled()
+    board = state['board']
+    moves = [col for col in center_first(board.columns) if board.is_valid_move(col)]
+    if not moves:
+        return 0
+
+    alpha_original, beta_original = alpha, beta
+    key, _ = canonical_key(state['hash'], state['mirror_hash'])
+    entry = cache.probe(key)
+    if entry is not None:
+        flag, stored = entry
+        if flag == EXACT:
+            return stored
+        if flag == LOWER:
+            alpha = max(alpha, stored)
+        else:
+            beta = min(beta, stored)
+        if alpha >= beta:
+            return stored
+
+    player = state['current_player']
+    best = -1
+    for move in moves:
+        make_move(state, move)
+        if state['winner'] == player:
+            score = 1
+        else:
+            score = -solve(state, -beta, -alpha, cache, node_counter, deadline, stop)
+        undo_move(state)
+        if score > best:
+            best = score
+        alpha = max(alpha, best)
+        if alpha >= beta:
+            if node_counter is not None and "cutoffs" in node_counter:
+                node_counter["cutoffs"][len(state['undo_stack'])] += 1
+            break
+
+    if best <= alpha_original:
+        flag = UPPER
+    elif best >= beta_original:
+        flag = LOWER
+    else:
+        flag = EXACT
+    cache.store(key, flag, best)
+    return best
+
+def solve_root(state, cache, node_counter=None, deadline=None, stop=None):
+    # Returns (value, move): the exact value for the player to move and the first move (center first) that reaches it
+    if node_counter is not None:
+        node_counter["count"] += 1
+    board = state['board']
+    player = state['current_player']
+    alpha = -1
+    best, best_move = -2, None
+    for move in [col for col in center_first(board.columns) if board.is_valid_move(col)]:
+        make_move(state, move)
+        if state['winner'] == player:
+            score = 1
+        else:
+            score = -solve(state, -1, -alpha, cache, node_counter, deadline, stop)
+        undo_move(state)
+        if score > best:
+            best, best_move = score, move
+        alpha = max(alpha, best)
+        if best == 1:
+            break
+    return best, best_move
 
 class ConnectFourAgent:
     def get_move(self, game_state):
         """Return the column (0-6) to place the next disc"""
         raise NotImplementedError("Subclasses must implement this method")
 
+class RandomAgent(ConnectFourAgent):
+    def __init__(self, seed=None):
+        # Own generator so a seeded game can be replayed exactly
+        self.rng = random.Random(seed)
+
+    def get_move(self, game_state):
+        return self.rng.choice(get_valid_moves(game_state)), 0
+
 class MinimaxAgent(ConnectFourAgent):
-    def __init__(self, max_depth=5, use_alpha_beta=False):
+    def __init__(self, max_depth=5, use_alpha_beta=False, use_bitboard=False, in_place=False,
+                 use_transposition=False, tt_size=1 << 20, time_limit_ms=None, ordering=None, incremental_eval=False,
+                 workers=None, opening_book=None, use_negamax=False, solve_below=None, solve_time_ms=1000,
+                 solver_cache_size=1 << 18, profile=False, verbose=False):
+        if workers is not None and (not use_alpha_beta or time_limit_ms is not None):
+            raise ValueError("workers needs use_alpha_beta=True and a fixed depth (no time_limit_ms)")
+        if time_limit_ms is not None and not use_alpha_beta:
+            raise ValueError("time_limit_ms needs use_alpha_beta=True, iterative deepening runs the Alpha-Beta search")
+        if use_negamax and not use_alpha_beta:
+            raise ValueError("use_negamax needs use_alpha_beta=True, principal variation search is a form of Alpha-Beta")
+        if ordering is not None and not use_alpha_beta:
+            raise ValueError("ordering needs use_alpha_beta=True, plain Minimax visits every move anyway")
+        if ordering == "hash" and not use_transposition:
+            raise ValueError("ordering='hash' needs use_transposition=True, the hash move comes from the transposition table")
+        if use_negamax and ordering is None:
+            # Null-window searches only pay off when the first move is usually the best one (ordering="none" to turn it off)
+            ordering = NEGAMAX_ORDERING
         self.max_depth = max_depth
         self.use_alpha_beta = use_alpha_beta
+        # Run the Alpha-Beta search as negamax with principal variation search and aspiration windows at the root,
+        # with ordering="all" unless another ordering is given (node counts in the README)
+        self.use_negamax = use_negamax
+        # Search on a BitBoard copy of the board instead of the list-of-lists grid
+        self.use_bitboard = use_bitboard
+        # Make and undo moves on one shared state instead of copying the state for every child
+        self.in_place = in_place
+        # Zobrist-hashed transposition table for the Alpha-Beta search, kept across turns of a game
+        self.tt = TranspositionTable(tt_size) if use_transposition else None
+        # Iterative deepening up to max_depth within this many milliseconds per move (None = fixed depth)
+        self.time_limit_ms = time_limit_ms
+        # Move ordering policy for the Alpha-Beta search, one of game.ordering.ORDERING_POLICIES (None = columns 0..6)
+        self.ordering_policy = ordering
+        self.ordering = make_ordering(ordering)
+        # Keep per-window disc counts on the state instead of rescanning all windows at every leaf
+        self.incremental_eval = incremental_eval
+        # Depth of the search the last move came from
+        self.last_depth = None
+        # Score (player 1's view) of the last negamax search, the center of the next aspiration window
+        self.last_score = None
+        # Settings a worker process needs to build the same agent for the parallel root search
+        self.search_options = {
+            "max_depth": max_depth, "use_alpha_beta": use_alpha_beta, "use_negamax": use_negamax, "use_bitboard": use_bitboard,
+            "in_place": in_place, "use_transposition": use_transposition, "tt_size": tt_size, "ordering": ordering,
+            "incremental_eval": incremental_eval, "verbose": False,
+        }
+        # Number of processes for the parallel root search (None = search on this process only)
+        self.workers = workers
+        self.pool = None
+        self.root_bounds = None
+        # Path of an opening book built with game.opening_book, positions found in it are played without a search
+        self.opening_book_path = opening_book
+        self.opening_book = None
+        # Solve the game exactly (win/draw/loss) once fewer than this many cells are empty (None = never)
+        self.solve_below = solve_below
+        # Give up on the exact solve after this many milliseconds and use the normal search for the move
+        self.solve_time_ms = solve_time_ms
+        # Solved positions stay valid for the whole run, the cache is never cleared
+        self.solver_cache = SolverCache(solver_cache_size) if solve_below is not None else None
+        # Exact value (1 win, 0 draw, -1 loss for the player to move) of the last solved move, None if it was searched
+        self.last_solved = None
+        # Set by cancel() from another thread to stop a running get_move
+        self.stop_event = threading.Event()
+        # Record nodes, leaves, cutoffs per ply, cache hits and time per function for every move (game.instrumentation)
+        self.profile = profile
+        # SearchProfile of the last move when profile is on
+        self.last_profile = None
+        # Where the last move came from: "book", "solved" or "search"
+        self.last_source = None
+        # Print the chosen move (and the profile when profile is on) after every move
+        self.verbose = verbose
+
+    def new_game(self):
+        # Positions from the previous game are unlikely to come back, start with an empty table
+        if self.tt is not None:
+            self.tt.clear()
+        self.last_score = None
+
+    def cancel(self):
+        # Called from another thread (e.g. the UI on quit): the running get_move raises SearchCancelled,
+        # with a time limit it returns the move of the last finished iteration instead.
+        # Stays set until reset_cancel(), so it also stops a get_move that has not started yet
+        self.stop_event.set()
+
+    def reset_cancel(self):
+        # Called before a move is handed to another thread (game.background.BackgroundMove), not by the search itself
+        self.stop_event.clear()
     
     def get_move(self, game_state):
+        node_counter = {"count": 0}
+        if self.profile:
+            self.last_profile = SearchProfile()
+            with self.last_profile.measure(self, node_counter):
+                best_move = self.choose_move(game_state, node_counter)
+        else:
+            best_move = self.choose_move(game_state, node_counter)
+
+        if self.verbose:
+            print(f"Selected Move by AI: {best_move} ({self.last_source}, {node_counter['count']} nodes)")
+            if self.profile:
+                print(self.last_profile.report())
+        return best_move, node_counter["count"]
+
+    def choose_move(self, game_state, node_counter):
         # Determine if maximizing or minimizing player
         maximizing_player = game_state['current_player'] == 1
-        node_counter = {"count": 0}
+
+        book_move = self.book_move(game_state)
+        if book_move is not None:
+            self.last_depth = None
+            self.last_source = "book"
+            return book_move
+
+        solved_move = self.solved_move(game_state, node_counter)
+        if solved_move is not None:
+            self.last_source = "solved"
+            return solved_move
+
+        self.last_source = "search"
+        game_state = self.prepare_state(game_state)
 
         if self.use_alpha_beta:
-            # Minimax with Alpha Beta Pruning
-            _, best_move = minimax_alpha_beta(game_state, 0, maximizing_player, self.max_depth, -math.inf, math.inf, node_counter)
+            if self.tt is not None:
+                self.tt.new_search()
+            if self.ordering is not None:
+                self.ordering.new_search()
+            if self.workers is not None:
+                best_move = self.parallel_root_search(game_state, maximizing_player, node_counter)
+            elif self.time_limit_ms is not None:
+                best_move = self.iterative_deepening(game_state, maximizing_player, node_counter)
+            elif self.use_negamax:
+                self.last_score, best_move = aspiration_search(game_state, self.max_depth, self.last_score, node_counter, self.in_place,
+                                                               self.tt, ordering=self.ordering, stop=self.stop_event)
+                self.last_depth = self.max_depth
+            else:
+                # Minimax with Alpha Beta Pruning
+                _, best_move = minimax_alpha_beta(game_state, 0, maximizing_player, self.max_depth, -math.inf, math.inf, node_counter, self.in_place, self.tt,
+                                                  ordering=self.ordering, stop=self.stop_event)
+                self.last_depth = self.max_depth
         else:
             # Regular Minimax
-            _, best_move = minimax(game_state, 0, maximizing_player, self.max_depth, node_counter)
+            _, best_move = minimax(game_state, 0, maximizing_player, self.max_depth, node_counter, self.in_place, self.stop_event)
+            self.last_depth = self.max_depth
+        return best_move
+
+    def book_move(self, game_state):
+        if self.opening_book_path is None:
+            return None
+        # The book is memory-mapped on first use, every process that opens it shares the same pages
+        if self.opening_book is None:
+            self.opening_book = OpeningBook(self.opening_book_path)
+        move = self.opening_book.get_move(game_state['board'], game_state['current_player'])
+        if move is None or not game_state['board'].is_valid_move(move):
+            return None
+        return move
+
+    def solved_move(self, game_state, node_counter):
+        self.last_solved = None
+        if self.solve_below is None:
+            return None
+        board = game_state['board']
+        empty_cells = sum(row.count(0) for row in board.grid)
+        if empty_cells >= self.solve_below or is_terminal(game_state):
+            return None
+        # The solver works on its own BitBoard copy, a timeout can leave it in the middle of a line
+        solve_board = board.copy() if isinstance(board, BitBoard) else BitBoard.from_board(board)
+        state = initialize_board(solve_board, game_state['current_player'])
+        keys = get_zobrist_keys(board.rows, board.columns)
+        state['hash'] = keys.hash_board(solve_board, state['current_player'])
+        state['mirror_hash'] = keys.hash_mirror(solve_board, state['current_player'])
+        deadline = time.perf_counter() + self.solve_time_ms / 1000 if self.solve_time_ms is not None else None
+        try:
+            self.last_solved, move = solve_root(state, self.solver_cache, node_counter, deadline, self.stop_event)
+        except SearchTimeout:
+            # The nodes spent so far stay in node_counter, the normal search adds its own
+            return None
+        self.last_depth = empty_cells
+        return move
+
+    def prepare_state(self, game_state):
+        board = game_state['board']
+        if self.use_bitboard and not isinstance(board, BitBoard):
+            search_board = BitBoard.from_board(board)
+        elif self.in_place:
+            # The in-place search mutates the board while it runs, so it gets its own copy
+            search_board = copy.deepcopy(board)
+        else:
+            search_board = board
+        # Fresh state so the keys added below (hash, evaluation counts) don't end up in the caller's state
+        state = initialize_board(search_board, game_state['current_player'])
+        if self.incremental_eval:
+            init_evaluation(state)
+        if self.use_alpha_beta and self.tt is not None:
+            keys = get_zobrist_keys(board.rows, board.columns)
+            state['hash'] = keys.hash_board(search_board, state['current_player'])
+        return state
+
+    def iterative_deepening(self, game_state, maximizing_player, node_counter):
+        deadline = time.perf_counter() + self.time_limit_ms / 1000
+        board = game_state['board']
+        # Searching deeper than the number of empty cells finds nothing new
+        empty_cells = sum(row.count(0) for row in board.grid)
+        best_move = None
+        pv = []
+        for depth in range(1, max(1, min(self.max_depth, empty_cells)) + 1):
+            line = []
+            try:
+                # Depth 1 always finishes so there is a move to return
+                if self.use_negamax:
+                    # The previous iteration's score centers the aspiration window, the TT's hash moves replace the PV hint
+                    score, move = aspiration_search(game_state, depth, self.last_score, node_counter, self.in_place, self.tt,
+                                                    deadline if depth > 1 else None, self.ordering, self.stop_event)
+                    self.last_score = score
+                else:
+                    score, move = minimax_alpha_beta(game_state, 0, maximizing_player, depth, -math.inf, math.inf, node_counter, self.in_place, self.tt,
+                                                     deadline if depth > 1 else None, pv, line, self.ordering, self.stop_event)
+            except SearchTimeout:
+                break
+            best_move = move
+            pv = line
+            self.last_depth = depth
+            # A forced win or loss won't change with a deeper search
+            if time.perf_counter() >= deadline or abs(score) == math.inf:
+                break
+        return best_move
+
+    def parallel_root_search(self, game_state, maximizing_player, node_counter):
+        # Each root move is searched in a worker process. The result is the same move the serial search picks:
+        # moves are merged in root order and a later move only wins with a strictly better score
+        node_counter["count"] += 1
+        if is_terminal(game_state):
+            return None
+        board = game_state['board']
+        moves = get_valid_moves(game_state)
+        if self.ordering is not None:
+            moves = self.ordering.order(game_state, moves, 0)
+        self.start_pool(board.columns)
+        # Exact scores of finished root moves, NaN while a move is still being searched
+        for index in range(len(self.root_bounds)):
+            self.root_bounds[index] = math.nan
+
+        tasks = [(index, self.search_options, board, game_state['current_player'], move) for index, move in enumerate(moves)]
+        results = sorted(self.pool.imap_unordered(search_root_move, tasks))
 
-        # Debug output:
-        print(f"Selected Move by AI: {best_move}")
-        print(f"Current Board State:\n{game_state['board'].grid}")
-        print(f"Nodes evaluated: {node_counter['count']}")
+        best_score = -math.inf if maximizing_player else math.inf
+        best_move = None
+        for index, score, nodes in results:
+            node_counter["count"] += nodes
+            if (maximizing_player and score > best_score) or (not maximizing_player and score < best_score):
+                best_score = score
+                best_move = moves[index]
+        self.last_depth = self.max_depth
+        return best_move
+
+    def start_pool(self, columns):
+        # The pool is created on the first parallel search and reused for every move after that
+        if self.pool is not None and len(self.root_bounds) >= columns:
+            return
+        self.close()
+        self.root_bounds = multiprocessing.Array('d', columns)
+        self.pool = multiprocessing.Pool(self.workers, initializer=init_root_worker, initargs=(self.root_bounds,))
+
+    def close(self):
+        # Shut down the worker processes of the parallel root search
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        if self.opening_book is not None:
+            self.opening_book.close()
+            self.opening_book = None
+
+# Parallel root search, these run inside the worker processes of MinimaxAgent.pool
+root_bounds = None
+worker_agents = {}
+
+def init_root_worker(bounds):
+    global root_bounds
+    root_bounds = bounds
 
-        return best_move, node_counter["count"]
\ No newline at end of file
+def search_root_move(task):
+    index, options, board, current_player, move = task
+    # One agent per configuration and process, so its transposition table and history survive between moves
+    key = tuple(sorted(options.items()))
+    agent = worker_agents.get(key)
+    if agent is None:
+        agent = MinimaxAgent(**options)
+        worker_agents[key] = agent
+    if agent.tt is not None:
+        agent.tt.new_search()
+    if agent.ordering is not None:
+        agent.ordering.new_search()
+
+    state = agent.prepare_state(initialize_board(board, current_player))
+    maximizing_player = current_player == 1
+    make_move(state, move)
+
+    # Earlier root moves that are already finished give this move its starting bound, like alpha/beta
+    # would after searching them one by one. Later moves are not used so ties still go to the earlier move
+    earlier = [bound for bound in root_bounds[:index] if not math.isnan(bound)]
+    alpha, beta = -math.inf, math.inf
+    if maximizing_player:
+        alpha = max(earlier, default=-math.inf)
+    else:
+        beta = min(earlier, default=math.inf)
+
+    node_counter = {"count": 0}
+    if agent.use_negamax:
+        # Player 1's window and score, seen from the player to move after the root move
+        color = 1 if state['current_player'] == 1 else -1
+        window = (alpha, beta) if color == 1 else (-beta, -alpha)
+        score, _ = negamax(state, 1, color, agent.max_depth, window[0], window[1], node_counter, agent.in_place, agent.tt,
+                           ordering=agent.ordering)
+        score *= color
+    else:
+        score, _ = minimax_alpha_beta(state, 1, not maximizing_player, agent.max_depth, alpha, beta, node_counter, agent.in_place, agent.tt,
+                                      ordering=agent.ordering)
+    # A score inside the window is exact and can tighten the bound of the moves after it
+    if (maximizing_player and score > alpha) or (not maximizing_player and score < beta):
+        root_bounds[index] = score
+    return index, score, node_counter["count"]
@@ -0,0 +1,53 @@
+""" background.py
+ - This file contains BackgroundMove, which computes the AI's move on a background thread
+    - main.py starts one for every AI turn and keeps running the pygame event loop (events, thinking indicator)
+      until done() is True, then takes the move with result()
+    - seconds is the time of the computation itself, measured on the background thread, so it doesn't include
+      the frames the UI loop waited for
+    - cancel() asks the computation to stop, e.g. MinimaxAgent.cancel when the window is closed during a search.
+      The thread is a daemon thread, so a computation that can't be stopped (a Gemini request) never keeps the program alive
+    - reset (e.g. MinimaxAgent.reset_cancel) is called before the thread starts, so a cancel() that comes before
+      the computation has started is not lost
+"""
+import threading
+import time
+from typing import Any, Callable, Optional
+
+class BackgroundMove:
+    def __init__(self, compute: Callable[[], Any], cancel: Optional[Callable[[], None]] = None,
+                 reset: Optional[Callable[[], None]] = None):
+        self.compute = compute
+        self.cancel_callback = cancel
+        if reset is not None:
+            reset()
+        self.value = None
+        self.seconds = None
+        self.error: Optional[BaseException] = None
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="ai-move", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            self.value = self.compute()
+            self.seconds = time.perf_counter() - start
+        except BaseException as error:
+            # - Handed to the main thread by result()
+            self.error = error
+        finally:
+            self.finished.set()
+
+    def done(self) -> bool:
+        return self.finished.is_set()
+
+    def result(self):
+        # - The computed value, re-raises the exception if the computation failed
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def cancel(self):
+        if self.cancel_callback is not None and not self.done():
+            self.cancel_callback()
@@ -0,0 +1,96 @@
+""" batch_eval.py
+ - This file contains the NumPy evaluation of many positions at once, e.g. the leaves of a search frontier or logged games
+    - evaluate_batch gives the same scores as connect_four.evaluate_board for a stack of positions,
+      grids is an array of shape (positions, rows, columns) with 0 = empty, 1 = player 1, 2 = player 2
+    - evaluate_bitboards does the same for an array of shape (positions, 2) with the two player masks of
+      game.bitboard.BitBoard (uint64, so up to 7x8 boards)
+    - get_window_masks turns the windows of connect_four.get_eval_tables into a (cells, windows) 0/1 matrix, built once per
+      geometry. Two matrix products count the discs of each player in every window of every position, the counts index
+      the window score table and the scores are summed per position, there is no Python loop over positions or windows
+    - value_batch does the same as connect_four.value: +inf / -inf when player 1 / player 2 has a line, 0 for a full board
+    - stack_grids and stack_bitboards build the input arrays from Board / BitBoard objects
+    - Only imported by code that asks for it, the rest of the engine doesn't need NumPy
+"""
+from functools import lru_cache
+from typing import Iterable, Union
+
+import numpy as np
+
+from game.board import get_windows
+
+@lru_cache(maxsize=None)
+def get_window_masks(rows: int = 6, columns: int = 7, connect: int = 4):
+    # - Returns (window mask matrix, window score table, line mask matrix), all read-only:
+    #   masks[cell, window] is 1 if the cell is in the window (cell = row * columns + col),
+    #   scores[player, key] is the score of a window with key = (connect + 1) * player 1 discs + player 2 discs,
+    #   lines[cell, line] is the same as masks for the real lines of game.board.get_windows (for the win test)
+    from connect_four import get_eval_tables
+
+    windows, _, _, window_scores = get_eval_tables(rows, columns, connect)
+    masks = np.zeros((rows * columns, len(windows)), dtype=np.float32)
+    for index, window in enumerate(windows):
+        for row, col in window:
+            masks[row * columns + col, index] = 1
+    scores = np.array([[0] * len(window_scores[1]), window_scores[1], window_scores[2]], dtype=np.int64)
+
+    winning_lines = get_windows(rows, columns, connect)
+    lines = np.zeros((rows * columns, len(winning_lines)), dtype=np.float32)
+    for index, line in enumerate(winning_lines):
+        for row, col in line:
+            lines[row * columns + col, index] = 1
+    for array in (masks, scores, lines):
+        array.setflags(write=False)
+    return masks, scores, lines
+
+def bitboards_to_grids(bitboards: np.ndarray, rows: int = 6, columns: int = 7) -> np.ndarray:
+    # - Bit col * (rows + 1) + height of a BitBoard mask is the cell at row rows - 1 - height (rows count from the top)
+    if columns * (rows + 1) > 64:
+        raise ValueError(f"A {rows}x{columns} BitBoard doesn't fit in 64 bits, pass grids instead")
+    bitboards = np.asarray(bitboards, dtype=np.uint64)
+    bits = np.array([[col * (rows + 1) + rows - 1 - row for col in range(columns)] for row in range(rows)], dtype=np.uint64)
+    player_one = (bitboards[:, 0, None, None] >> bits) & np.uint64(1)
+    player_two = (bitboards[:, 1, None, None] >> bits) & np.uint64(1)
+    return (player_one + 2 * player_two).astype(np.int8)
+
+def disc_counts(grids: np.ndarray, masks: np.ndarray):
+    # - Discs of player 1 and player 2 in every window, shape (positions, windows)
+    flat = grids.reshape(len(grids), -1)
+    player_one = (flat == 1).astype(np.float32) @ masks
+    player_two = (flat == 2).astype(np.float32) @ masks
+    return player_one.astype(np.int64), player_two.astype(np.int64)
+
+def evaluate_batch(grids: np.ndarray, current_player: Union[int, np.ndarray] = 1, connect: int = 4) -> np.ndarray:
+    # - current_player is one player for all positions or an array with one per position, like state['current_player']
+    grids = np.asarray(grids)
+    rows, columns = grids.shape[1], grids.shape[2]
+    masks, scores, _ = get_window_masks(rows, columns, connect)
+    player_one, player_two = disc_counts(grids, masks)
+    keys = player_one * (connect + 1) + player_two
+    players = np.broadcast_to(np.asarray(current_player), (len(grids),))
+    return scores[players[:, None], keys].sum(axis=1)
+
+def evaluate_bitboards(bitboards: np.ndarray, current_player: Union[int, np.ndarray] = 1, rows: int = 6, columns: int = 7,
+                       connect: int = 4) -> np.ndarray:
+    return evaluate_batch(bitboards_to_grids(bitboards, rows, columns), current_player, connect)
+
+def value_batch(grids: np.ndarray, current_player: Union[int, np.ndarray] = 1, connect: int = 4) -> np.ndarray:
+    # - Same order of checks as connect_four.value, as floats so the wins can be +inf / -inf
+    grids = np.asarray(grids)
+    rows, columns = grids.shape[1], grids.shape[2]
+    _, _, lines = get_window_masks(rows, columns, connect)
+    player_one, player_two = disc_counts(grids, lines)
+    values = evaluate_batch(grids, current_player, connect=connect).astype(np.float64)
+    full = (grids[:, 0, :] != 0).all(axis=1)
+    values[full] = 0
+    # - A position can only have both when it was set up by hand, check_win reports player 1 first
+    values[(player_two == connect).any(axis=1)] = -np.inf
+    values[(player_one == connect).any(axis=1)] = np.inf
+    return values
+
+def stack_grids(boards: Iterable) -> np.ndarray:
+    # - Board or BitBoard objects of the same size, shape (positions, rows, columns)
+    return np.array([board.grid for board in boards], dtype=np.int8)
+
+def stack_bitboards(bitboards: Iterable) -> np.ndarray:
+    # - BitBoard objects, shape (positions, 2)
+    return np.array([bitboard.masks for bitboard in bitboards], dtype=np.uint64)
@@ -0,0 +1,143 @@
+""" bitboard.py
+ - This file contains the BitBoard class, an integer-mask version of the Board used by the search
+    - Each player's discs are kept in one integer, one bit per cell
+    - Bits are laid out column by column, bottom to top, with one spare bit on top of every column
+      so that shifting a line never wraps into the neighbouring column
+    - heights keeps the number of discs in each column, which makes drop and undo O(1)
+    - The connect-in-a-row test is a shift-and-AND in each of the four directions
+    - BitBoard.from_board and BitBoard.to_board convert to and from the Board dataclass used by the UI
+    - The BitBoard has the same methods as Board (is_valid_move, get_next_open_row, drop_piece, remove_piece, to_string)
+      so it can be used wherever the search expects a board
+"""
+from typing import List, Optional
+from game.board import Board
+
+class BitBoard:
+    def __init__(self, rows: int = 6, columns: int = 7, connect: int = 4):
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        # - Each column uses rows + 1 bits, the top one is always empty
+        self.column_height = rows + 1
+        # - masks[0] holds player 1's discs, masks[1] holds player 2's discs
+        self.masks = [0, 0]
+        self.heights = [0] * columns
+        # - Columns played so far, used by undo()
+        self.moves: List[int] = []
+
+    @classmethod
+    def from_board(cls, board: Board) -> "BitBoard":
+        bitboard = cls(board.rows, board.columns, board.connect)
+        for col in range(board.columns):
+            for row in range(board.rows - 1, -1, -1):
+                piece = board.grid[row][col]
+                if piece == 0:
+                    break
+                bitboard.drop(col, piece)
+            # - A disc sitting above an empty cell can't be represented as a stack
+            for row in range(board.rows - 1 - bitboard.heights[col], -1, -1):
+                if board.grid[row][col] != 0:
+                    raise ValueError(f"Column {col} has a floating disc at row {row}.")
+        # - The order the discs were played in is unknown, so there is nothing to undo
+        bitboard.moves = []
+        return bitboard
+
+    def to_board(self) -> Board:
+        return Board(self.rows, self.columns, self.grid, self.connect)
+
+    def copy(self) -> "BitBoard":
+        bitboard = BitBoard.__new__(BitBoard)
+        bitboard.rows = self.rows
+        bitboard.columns = self.columns
+        bitboard.connect = self.connect
+        bitboard.column_height = self.column_height
+        bitboard.masks = self.masks[:]
+        bitboard.heights = self.heights[:]
+        bitboard.moves = self.moves[:]
+        return bitboard
+
+    def __deepcopy__(self, memo):
+        # - Everything inside is an int or a list of ints, a shallow copy of the lists is enough
+        return self.copy()
+
+    @property
+    def grid(self) -> List[List[int]]:
+        grid = [[0] * self.columns for _ in range(self.rows)]
+        for col in range(self.columns):
+            base = col * self.column_height
+            for height in range(self.heights[col]):
+                bit = 1 << (base + height)
+                grid[self.rows - 1 - height][col] = 1 if self.masks[0] & bit else 2
+        return grid
+
+    def reset_board(self):
+        self.masks = [0, 0]
+        self.heights = [0] * self.columns
+        self.moves = []
+
+    def is_valid_move(self, col: int) -> bool:
+        return self.heights[col] < self.rows
+
+    def get_next_open_row(self, col: int) -> Optional[int]:
+        # - Rows are counted from the top like in Board.grid
+        if self.heights[col] < self.rows:
+            return self.rows - 1 - self.heights[col]
+        return None
+
+    def drop(self, col: int, piece: int) -> int:
+        height = self.heights[col]
+        self.masks[piece - 1] |= 1 << (col * self.column_height + height)
+        self.heights[col] = height + 1
+        self.moves.append(col)
+        return self.rows - 1 - height
+
+    def undo(self) -> int:
+        col = self.moves.pop()
+        self._clear_top(col)
+        return col
+
+    def _clear_top(self, col: int):
+        height = self.heights[col] - 1
+        bit = 1 << (col * self.column_height + height)
+        if self.masks[0] & bit:
+            self.masks[0] ^= bit
+        else:
+            self.masks[1] ^= bit
+        self.heights[col] = height
+
+    def drop_piece(self, row: int, col: int, piece: int):
+        # - Same signature as Board.drop_piece, the disc always lands on top of the column
+        if row != self.get_next_open_row(col):
+            raise ValueError(f"Row {row} is not the next open row of column {col}.")
+        self.drop(col, piece)
+
+    def remove_piece(self, row: int, col: int):
+        # - Same signature as Board.remove_piece, only the top disc of a column can be removed
+        if self.heights[col] == 0 or row != self.rows - self.heights[col]:
+            raise ValueError(f"Row {row} is not the top disc of column {col}.")
+        if self.moves and self.moves[-1] == col:
+            self.moves.pop()
+        self._clear_top(col)
+
+    def has_won(self, piece: int) -> bool:
+        mask = self.masks[piece - 1]
+        # - vertical, horizontal, diagonal south-west to north-east, diagonal north-west to south-east
+        for shift in (1, self.column_height, self.column_height + 1, self.column_height - 1):
+            if self.connect == 4:
+                pairs = mask & (mask >> shift)
+                if pairs & (pairs >> (2 * shift)):
+                    return True
+            else:
+                # - A bit survives if the connect - 1 cells after it in this direction are set too
+                line = mask
+                for step in range(1, self.connect):
+                    line &= mask >> (step * shift)
+                if line:
+                    return True
+        return False
+
+    def is_full(self) -> bool:
+        return all(height == self.rows for height in self.heights)
+
+    def to_string(self):
+        return self.to_board().to_string()
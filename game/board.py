@@ -6,33 +6,63 @@
         - rows: the number of rows in the board
         - columns: the number of columns in the board
         - grid: a 2D list representing the board
+        - connect: how many pieces in a line win (4 for Connect 4)
     - The Board class has the following methods:
         - reset_board: resets the board to its initial state
         - is_valid_move: checks if a move is valid
         - get_next_open_row: gets the next open row in a column
         - drop_piece: drops a piece in the board
+        - remove_piece: clears a cell again, used to undo a move
     - The functions check_win checks if a player has won the game
+    - get_windows gives every line of connect cells on a rows x columns board, computed once per geometry and cached,
+      check_win and the evaluation in connect_four.py work from it instead of looping over the board
+    - The function check_win_at only checks the lines going through one cell, which is enough right after a piece is dropped there
 """ 
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
 
-def create_empty_grid() -> List[List[int]]:
+def create_empty_grid(rows: int = 6, columns: int = 7) -> List[List[int]]:
     grid: List[List[int]] = []
-    for i in range(6):
+    for i in range(rows):
         row: List[int] = []
-        for j in range(7):
+        for j in range(columns):
             row.append(0)
         grid.append(row)
     return grid
 
+@lru_cache(maxsize=None)
+def get_windows(rows: int = 6, columns: int = 7, connect: int = 4) -> Tuple[Tuple[Tuple[int, int], ...], ...]:
+    # - Every line of connect cells as (row, col) pairs: horizontal, vertical,
+    #   diagonal south west to north-east, diagonal north-west to south east
+    windows = []
+    for row_index in range(rows):
+        for col_index in range(columns - connect + 1):
+            windows.append(tuple((row_index, col_index + i) for i in range(connect)))
+    for col_index in range(columns):
+        for row_index in range(rows - connect + 1):
+            windows.append(tuple((row_index + i, col_index) for i in range(connect)))
+    for row_index in range(rows - connect + 1):
+        for col_index in range(columns - connect + 1):
+            windows.append(tuple((row_index + i, col_index + i) for i in range(connect)))
+    for row_index in range(connect - 1, rows):
+        for col_index in range(columns - connect + 1):
+            windows.append(tuple((row_index - i, col_index + i) for i in range(connect)))
+    return tuple(windows)
+
 @dataclass
 class Board:
     rows: int = 6
     columns: int = 7
-    grid: List[List[int]] = field(default_factory=create_empty_grid)
+    grid: Optional[List[List[int]]] = None
+    connect: int = 4
+
+    def __post_init__(self):
+        if self.grid is None:
+            self.grid = create_empty_grid(self.rows, self.columns)
 
     def reset_board(self):
-        self.grid = create_empty_grid()
+        self.grid = create_empty_grid(self.rows, self.columns)
 
     def is_valid_move(self, col: int):
         return self.grid[0][col] == 0
@@ -46,6 +76,9 @@ class Board:
     def drop_piece(self, row: int, col: int, piece: int):
         self.grid[row][col] = piece
 
+    def remove_piece(self, row: int, col: int):
+        self.grid[row][col] = 0
+
     def to_string(self):
         # - I'm mapping 1 and 2 to A and B since Gemini was mixing the numbers up with the column numbers
         board_str = ""
@@ -57,48 +90,27 @@ class Board:
         return board_str
 
 def check_win(board: Board, piece: int) -> bool:
-    # - horizontal
-    for row_index in range(board.rows):
-        for col_index in range(board.columns - 3):
-            cell_1 = board.grid[row_index][col_index]
-            cell_2 = board.grid[row_index][col_index + 1]
-            cell_3 = board.grid[row_index][col_index + 2]
-            cell_4 = board.grid[row_index][col_index + 3]
-
-            if cell_1 == piece and cell_2 == piece and cell_3 == piece and cell_4 == piece:
-                return True
-
-    # - vertical
-    for col_index in range(board.columns):
-        for row_index in range(board.rows - 3):
-            cell_1 = board.grid[row_index][col_index]
-            cell_2 = board.grid[row_index + 1][col_index]
-            cell_3 = board.grid[row_index + 2][col_index]
-            cell_4 = board.grid[row_index + 3][col_index]
-
-            if cell_1 == piece and cell_2 == piece and cell_3 == piece and cell_4 == piece:
-                return True
-
-    # - diagonal, south west to north-east
-    for row_index in range(board.rows - 3):
-        for col_index in range(board.columns - 3):
-            cell_1 = board.grid[row_index][col_index]
-            cell_2 = board.grid[row_index + 1][col_index + 1]
-            cell_3 = board.grid[row_index + 2][col_index + 2]
-            cell_4 = board.grid[row_index + 3][col_index + 3]
-
-            if cell_1 == piece and cell_2 == piece and cell_3 == piece and cell_4 == piece:
-                return True
-
-    # - diagonal, north-west to south east
-    for row_index in range(3, board.rows):
-        for col_index in range(board.columns - 3):
-            cell_1 = board.grid[row_index][col_index]
-            cell_2 = board.grid[row_index - 1][col_index + 1]
-            cell_3 = board.grid[row_index - 2][col_index + 2]
-            cell_4 = board.grid[row_index - 3][col_index + 3]
-
-            if cell_1 == piece and cell_2 == piece and cell_3 == piece and cell_4 == piece:
-                return True
-
-    return False
\ No newline at end of file
+    grid = board.grid
+    for window in get_windows(board.rows, board.columns, board.connect):
+        for row, col in window:
+            if grid[row][col] != piece:
+                break
+        else:
+            return True
+    return False
+
+def check_win_at(board: Board, row: int, col: int, piece: int) -> bool:
+    # - Only lines through (row, col) can have been completed by a piece dropped there
+    # - vertical, horizontal, diagonal south west to north-east, diagonal north-west to south east
+    for row_step, col_step in ((1, 0), (0, 1), (-1, 1), (1, 1)):
+        count = 1
+        for direction in (1, -1):
+            r = row + row_step * direction
+            c = col + col_step * direction
+            while 0 <= r < board.rows and 0 <= c < board.columns and board.grid[r][c] == piece:
+                count += 1
+                r += row_step * direction
+                c += col_step * direction
+        if count >= board.connect:
+            return True
+    return False
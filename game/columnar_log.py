@@ -0,0 +1,165 @@
+""" columnar_log.py
+ - This file contains a chunked, column-oriented binary format for the move and game logs
+    - A file starts with a magic string and the schema (column names and types), followed by any number of chunks
+    - Each chunk stores its row count and then every column on its own:
+        - "i" columns as little-endian int64 values, "d" columns as little-endian float64 values (NaN for missing, e.g. "N/A" nodes)
+        - "s" columns as a small table of the distinct strings in the chunk followed by one uint32 code per row
+    - New chunks are simply appended at the end of the file, nothing already written is rewritten
+    - read_chunks streams a file one chunk at a time as {column: list of values}, read_csv_chunks gives the
+      same chunks from the existing CSV logs, so the same analysis runs on both formats in bounded memory
+    - ColumnarWriter has the same write/flush/close methods as game.run_log.BufferedCsvWriter
+"""
+import csv
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterator, List, Tuple
+
+MAGIC = b"C4COL1\n"
+COLUMNAR_EXTENSION = ".c4col"
+
+MOVE_LOG_SCHEMA = [("GameNum", "i"), ("Turn", "i"), ("AgentUsed", "s"), ("Move", "i"), ("Time(s)", "d"), ("Nodes", "d")]
+GAME_LOG_SCHEMA = [("GameNum", "i"), ("AgentUsed", "s"), ("PlayerResult", "s"), ("AgentResult", "s"),
+                   ("PlayerScore", "i"), ("AgentScore", "i"), ("GameTime", "d"), ("Simulated", "i")]
+
+# - Older logs use other names for some columns
+COLUMN_ALIASES = {"Nodes1": "Nodes", "Game": "GameNum", "Agent": "AgentUsed"}
+
+def to_value(value, column_type: str):
+    if column_type == "s":
+        return str(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if column_type == "i":
+        return 0 if math.isnan(number) else int(number)
+    return number
+
+def typed_array(column_type: str, values) -> array:
+    data = array("q" if column_type == "i" else "d", values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+class ColumnarWriter:
+    def __init__(self, path: str, schema: List[Tuple[str, str]], max_rows: int = 65536):
+        self.path = path
+        self.schema = schema
+        self.max_rows = max_rows
+        is_new = not os.path.exists(path) or os.stat(path).st_size == 0
+        if not is_new:
+            existing = read_schema(path)
+            if existing != schema:
+                raise ValueError(f"{path} was written with a different schema: {existing}")
+        self.file = open(path, mode='ab')
+        if is_new:
+            header = json.dumps(schema).encode()
+            self.file.write(MAGIC + struct.pack("<I", len(header)) + header)
+        self.rows: List[List] = []
+
+    def write(self, row: List):
+        self.rows.append(row)
+        if len(self.rows) >= self.max_rows:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.file.write(encode_chunk(self.schema, self.rows))
+            self.rows = []
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+def encode_chunk(schema: List[Tuple[str, str]], rows: List[List]) -> bytes:
+    parts = [struct.pack("<I", len(rows))]
+    for index, (_, column_type) in enumerate(schema):
+        values = [to_value(row[index], column_type) for row in rows]
+        if column_type == "s":
+            strings: Dict[str, int] = {}
+            codes = array("I", (strings.setdefault(value, len(strings)) for value in values))
+            if sys.byteorder != "little":
+                codes.byteswap()
+            table = json.dumps(list(strings)).encode()
+            parts.append(struct.pack("<I", len(table)) + table + codes.tobytes())
+        else:
+            parts.append(typed_array(column_type, values).tobytes())
+    return b"".join(parts)
+
+def read_schema(path: str) -> List[Tuple[str, str]]:
+    with open(path, mode='rb') as file:
+        return read_header(file)
+
+def read_header(file) -> List[Tuple[str, str]]:
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{file.name} is not a columnar log")
+    (length,) = struct.unpack("<I", file.read(4))
+    return [tuple(column) for column in json.loads(file.read(length))]
+
+def read_chunks(path: str) -> Iterator[Dict[str, list]]:
+    with open(path, mode='rb') as file:
+        schema = read_header(file)
+        while True:
+            head = file.read(4)
+            if len(head) < 4:
+                return
+            (rows,) = struct.unpack("<I", head)
+            chunk = {}
+            for name, column_type in schema:
+                if column_type == "s":
+                    (length,) = struct.unpack("<I", file.read(4))
+                    strings = json.loads(file.read(length))
+                    codes = array("I")
+                    codes.frombytes(file.read(rows * codes.itemsize))
+                    if sys.byteorder != "little":
+                        codes.byteswap()
+                    chunk[name] = [strings[code] for code in codes]
+                else:
+                    values = array("q" if column_type == "i" else "d")
+                    values.frombytes(file.read(rows * values.itemsize))
+                    if sys.byteorder != "little":
+                        values.byteswap()
+                    chunk[name] = values.tolist()
+            yield chunk
+
+def read_csv_chunks(path: str, schema: List[Tuple[str, str]], chunk_rows: int = 65536) -> Iterator[Dict[str, list]]:
+    # - Streams a CSV log in chunks shaped like read_chunks, columns are matched by name
+    with open(path, mode='r', newline='') as file:
+        reader = csv.reader(file)
+        header = [COLUMN_ALIASES.get(name.strip(), name.strip()) for name in next(reader)]
+        positions = [header.index(name) if name in header else None for name, _ in schema]
+        columns = {name: [] for name, _ in schema}
+        rows = 0
+        for row in reader:
+            if not row:
+                continue
+            for (name, column_type), position in zip(schema, positions):
+                value = row[position] if position is not None and position < len(row) else ""
+                columns[name].append(to_value(value, column_type))
+            rows += 1
+            if rows == chunk_rows:
+                yield columns
+                columns = {name: [] for name, _ in schema}
+                rows = 0
+        if rows:
+            yield columns
+
+def read_log_chunks(path: str, schema: List[Tuple[str, str]], chunk_rows: int = 65536) -> Iterator[Dict[str, list]]:
+    # - Picks the reader from the file extension
+    if path.endswith(COLUMNAR_EXTENSION):
+        return read_chunks(path)
+    return read_csv_chunks(path, schema, chunk_rows)
+
+def convert_csv(csv_path: str, columnar_path: str, schema: List[Tuple[str, str]], chunk_rows: int = 65536):
+    writer = ColumnarWriter(columnar_path, schema, chunk_rows)
+    names = [name for name, _ in schema]
+    for chunk in read_csv_chunks(csv_path, schema, chunk_rows):
+        for row in zip(*(chunk[name] for name in names)):
+            writer.write(list(row))
+    writer.close()
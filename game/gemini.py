@@ -6,20 +6,15 @@
   - The class uses the google.genai library to interact with the Gemini API
   - The class uses the game.board module to interact with the Connect 4 board
   - The class uses the os library to load environment variables
+  - Importing this file has no side effects: the SDK is imported, the .env file is read and the API key is checked
+    the first time get_gemini() is called (on the first move), not at import
 """
 import os
-import google.generativeai as genai
 from game.board import Board, check_win
-from dotenv import load_dotenv
 from typing import Literal, Tuple, List
-import re
 import time
 import csv
-load_dotenv()
-
-gemini_key = os.getenv("GEMINI_API_KEY")
-if not gemini_key:
-  raise ValueError("GEMINI_API_KEY is not provided. Please provide it in .env file")
+from game.gemini_prompts import analysis_prompt, column_prompt, retry_prompt, parse_column
 
 logged_games = set()
 
@@ -42,6 +37,7 @@ def start_new_game_log(game_num: int):
 
 class GeminiAPI:
   def __init__(self, api_key: str) -> None:
+    import google.generativeai as genai
     genai.configure(api_key=api_key)
     self.model = genai.GenerativeModel(model_name="models/gemini-2.0-flash")
 
@@ -68,28 +64,24 @@ class GeminiAPI:
 
   def json(self, prompt: str, schema):
     response = self.model.generate_content(prompt)
-    match = re.findall(r"\b[1-7]\b", response.text)
-    if match:
-        return int(match[0])
+    column = parse_column(response.text)
+    if column is not None:
+        return column
     raise ValueError("Could not parse a valid column number from Gemini response.")
 
-gemini = GeminiAPI(gemini_key)
-
-# - These are all rules that I added as I found flaws in its reasonings. Add or remove rules as you wish
-rules = """Rules:
-- Player A uses pieces marked as A.
-- Player B uses pieces marked as B. You are player B.
-- Empty slots are marked as 0.
-- A player wins if they connect four of their pieces in a row, column, or diagonal.
-- As much as it is important for you to win, it is important to stop player A from getting close to winning. For example if a player A has 3 in a row, you must block them from getting the 4th.
-- You cannot place anything on a column that's full. If the top row of a column you pick has a number, avoid using that column.
-- Pick the best move that would let you as player B to win the game by connection 4 in a row. 
-- Stop player A from getting 4 in a row. For example, if you see the player has 3 'A's stacked, you must select that column to stop the player.
-- If a player A has 2 'A's in a row with an ability to place their piece on either side to make 4 in a row, make sure you block at least 1 side so it doesn't lead to a fork or a double threat.
-- If there is not enough room for you to create 4 in a row, there is no need to pursue that path.
-- If player A has 3 in a row, attempt to stop them at all costs. Consider all the locations that the player can place their next move. Remember, they can only stack them.
-- If a potential threat is surrounded by 'B's and there are no '0's for A to be placed to form 4 in a row, then it is not a threat.
-"""
+gemini = None
+
+def get_gemini() -> GeminiAPI:
+  # - The client is created on first use
+  global gemini
+  if gemini is None:
+    from dotenv import load_dotenv
+    load_dotenv()
+    gemini_key = os.getenv("GEMINI_API_KEY")
+    if not gemini_key:
+      raise ValueError("GEMINI_API_KEY is not provided. Please provide it in .env file")
+    gemini = GeminiAPI(gemini_key)
+  return gemini
 
 def get_move_from_gemini(board: Board, game_num: int) -> int: # - Make sure this is an int
     if game_num not in logged_games:
@@ -97,17 +89,8 @@ def get_move_from_gemini(board: Board, game_num: int) -> int: # - Make sure this
         logged_games.add(game_num)
     printed = board.to_string()
     print(f"------------------------------------\nThinking\n{printed}\n------------------------------------")
-    prompt = f"""You are a professional Connect 4 player. 
-
-{rules}
-
-Current Connect 4 Board:
-
-{printed}
-
-The bottom row represent the column number.
-
-Analyze the board and respond with what your best options are, that would prevent player A from winning and help you win, and explain your reasoning. Think hard. The column you pick must have at least 1 empty slot."""
+    gemini = get_gemini()
+    prompt = analysis_prompt(printed)
 
     # - Switch with gemini.generate_with_thinking for a very slightly stronger opponent, though the response times are much longer
     response = gemini.generate(prompt)
@@ -118,14 +101,7 @@ Analyze the board and respond with what your best options are, that would preven
         f.write("RESPONSE:\n" + response + "\n")
         f.write("------------------------------------------------------------\n")
 
-    prompt = f"""You are a professional Connect 4 strategist.
-    
-{rules}
-
-Analyze the thought process and commentary below, and choose the BEST column number (1 to {board.columns}) for player B to play. Only return a single integer on its own line. Do not include any explanation.
-
-{response}
-"""
+    prompt = column_prompt(response, board.columns)
 
     col = gemini.json(prompt, int)
     if isinstance(col, str) and col.startswith("ERROR"):
@@ -156,7 +132,7 @@ Analyze the thought process and commentary below, and choose the BEST column num
                 if board.is_valid_move(i):
                     return i
             raise RuntimeError("Gemini and fallback logic failed to find a valid move.")
-        res = gemini.json(prompt + f"\nThe previous model responded with the following columns but they are invalid: " + ", ".join(f'"{num}"' for num in failedAttempts), int)
+        res = gemini.json(retry_prompt(prompt, failedAttempts), int)
         col = res
         col_index = col - 1
         print(f"New column: {col}")
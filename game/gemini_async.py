@@ -0,0 +1,239 @@
+""" gemini_async.py
+  - This file contains an asyncio client for Gemini moves, used to run the requests of many games at the same time
+  - AsyncGeminiClient.get_move sends the same two prompts as game/gemini.py (analysis, then column) and returns a 0-based column
+  - Requests go through:
+    - TokenBucket: at most requests_per_minute requests per minute (the free tier quota), short bursts allowed
+    - a semaphore: at most max_concurrency requests waiting on the API at once
+    - backoff: a 429 (quota exceeded) answer is retried after backoff_seconds, doubling on every retry, other errors likewise
+  - ResponseCache keeps the chosen move for every board string in a JSON lines file (gemini_cache.jsonl),
+    a position that was asked once never goes to the API again, also in later runs. Games that reach a board while
+    it is still being asked wait for that request (AsyncGeminiClient.pending) instead of sending their own
+  - The model is any object with an async generate_content_async(prompt) that returns something with a .text,
+    by default the google.generativeai model (only created on the first request). FakeGeminiModel answers
+    locally, so the client can run without an API key or network
+  - play_games plays Gemini (player 2) against a regular agent (player 1) in many games at once and returns
+    the same move and game records as simulation.play_game
+"""
+import asyncio
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from game.board import Board, check_win_at
+from game.gemini_prompts import analysis_prompt, column_prompt, retry_prompt, parse_column
+
+# - Free tier limit of gemini-2.0-flash, https://ai.google.dev/gemini-api/docs/rate-limits#free-tier
+FREE_TIER_REQUESTS_PER_MINUTE = 15
+
+class TokenBucket:
+    def __init__(self, requests_per_minute: float = FREE_TIER_REQUESTS_PER_MINUTE, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60
+        self.capacity = burst if burst is not None else max(1, int(requests_per_minute // 4))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        # - Waits until a token is available and takes it, waiting callers are served in order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class ResponseCache:
+    def __init__(self, path: Optional[str] = "gemini_cache.jsonl"):
+        # - path None keeps the cache in memory only
+        self.path = path
+        self.entries: Dict[str, Dict] = {}
+        if path is not None and os.path.exists(path):
+            with open(path, mode='r') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # - a line cut off by a crash
+                    self.entries[entry["board"]] = entry
+
+    def get(self, board: str) -> Optional[Dict]:
+        return self.entries.get(board)
+
+    def put(self, board: str, move: int, response: str):
+        entry = {"board": board, "move": move, "response": response}
+        self.entries[board] = entry
+        if self.path is not None:
+            # - Appended and flushed right away, so an interrupted run keeps everything it paid for
+            with open(self.path, mode='a') as file:
+                file.write(json.dumps(entry) + "\n")
+
+def is_rate_limited(error: Exception) -> bool:
+    # - google.api_core raises ResourceExhausted (code 429), other clients put the status in code or status_code
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or type(error).__name__ == "ResourceExhausted" or "429" in str(error)
+
+class AsyncGeminiClient:
+    def __init__(self, model=None, requests_per_minute: float = FREE_TIER_REQUESTS_PER_MINUTE, max_concurrency: int = 4,
+                 cache_path: Optional[str] = "gemini_cache.jsonl", max_retries: int = 5, backoff_seconds: float = 2.0,
+                 max_backoff_seconds: float = 60.0):
+        self.model = model
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.cache = ResponseCache(cache_path)
+        # - board string: task asking Gemini for it, while the answer is not in the cache yet
+        self.pending: Dict[str, asyncio.Task] = {}
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.requests = 0
+        self.rate_limited = 0
+        self.cache_hits = 0
+
+    def get_model(self):
+        if self.model is None:
+            # - Only loaded when the first request is sent, so the client can be built without the SDK or an API key
+            from game.gemini import get_gemini
+            self.model = get_gemini().model
+        return self.model
+
+    async def generate(self, prompt: str) -> Tuple[str, float]:
+        # - Returns the answer and the seconds spent waiting on the API (not in the rate limiter or in backoff)
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        model = self.get_model()
+        api_seconds = 0.0
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            async with self.semaphore:
+                start = time.perf_counter()
+                try:
+                    self.requests += 1
+                    response = await model.generate_content_async(prompt)
+                    return response.text, api_seconds + time.perf_counter() - start
+                except Exception as error:
+                    api_seconds += time.perf_counter() - start
+                    if attempt == self.max_retries:
+                        raise
+                    if is_rate_limited(error):
+                        self.rate_limited += 1
+            # - Exponential backoff with jitter, so concurrent games don't all retry at the same moment
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt)
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+
+    async def get_move(self, board: Board, max_tries: int = 3) -> Tuple[int, float]:
+        # - Returns (0-based column, seconds spent on the API), 0 seconds when the move came from the cache
+        #   or from the request of another game for the same board
+        printed = board.to_string()
+        cached = self.cache.get(printed)
+        if cached is not None and board.is_valid_move(cached["move"]):
+            self.cache_hits += 1
+            return cached["move"], 0.0
+
+        task = self.pending.get(printed)
+        if task is not None:
+            self.cache_hits += 1
+            move, _ = await asyncio.shield(task)
+            return move, 0.0
+        # - shield: cancelling one game doesn't cancel the request the other games wait on
+        task = asyncio.ensure_future(self.ask(board, printed, max_tries))
+        self.pending[printed] = task
+        # - By then the move is in the cache (or it was a fallback move, which is asked again next time)
+        task.add_done_callback(lambda _: self.pending.pop(printed, None))
+        return await asyncio.shield(task)
+
+    async def ask(self, board: Board, printed: str, max_tries: int) -> Tuple[int, float]:
+        response, analysis_seconds = await self.generate(analysis_prompt(printed))
+        prompt = column_prompt(response, board.columns)
+        api_seconds = analysis_seconds
+        failed_columns: List[int] = []
+        for _ in range(max_tries):
+            answer, seconds = await self.generate(retry_prompt(prompt, failed_columns) if failed_columns else prompt)
+            api_seconds += seconds
+            column = parse_column(answer)
+            if column is not None and 1 <= column <= board.columns and board.is_valid_move(column - 1):
+                self.cache.put(printed, column - 1, response)
+                return column - 1, api_seconds
+            # - An answer without a column is asked again, only columns that were actually played go in the retry prompt
+            if column is not None:
+                failed_columns.append(column)
+
+        # - Same fallback as game/gemini.py: the center column, else the first open one (not cached)
+        fallback = board.columns // 2
+        if board.is_valid_move(fallback):
+            return fallback, api_seconds
+        return next(col for col in range(board.columns) if board.is_valid_move(col)), api_seconds
+
+class FakeGeminiModel:
+    # - Local stand-in for the Gemini model: answers after latency seconds with a random open column
+    #   and answers every rate_limit_every-th request with a 429 error (0 = never)
+    def __init__(self, latency: float = 0.05, rate_limit_every: int = 0, seed: Optional[int] = None):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def generate_content_async(self, prompt: str):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.latency)
+        if self.rate_limit_every and call % self.rate_limit_every == 0:
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        return SimpleNamespace(text=f"I'll play column {self.rng.randint(1, 7)}.")
+
+async def play_game(client: AsyncGeminiClient, opponent, game_number: int = 1, opponent_label: Optional[str] = None) -> List[Tuple[str, List]]:
+    # - opponent (player 1) is a regular ConnectFourAgent, its get_move runs on a worker thread between Gemini's requests
+    from connect_four import initialize_board
+    from simulation import agent_label
+
+    board = Board()
+    labels = {1: opponent_label or agent_label(opponent), 2: "gemini"}
+    records = []
+    winner = None
+    game_start_time = time.perf_counter()
+    for turn in range(board.rows * board.columns):
+        player = 1 if turn % 2 == 0 else 2
+        if player == 1:
+            start_time = time.perf_counter()
+            # - On a worker thread, so the requests of the other games go on while this agent searches
+            col, nodes = await asyncio.to_thread(opponent.get_move, initialize_board(board, player))
+            duration = time.perf_counter() - start_time
+        else:
+            col, duration = await client.get_move(board)
+            nodes = "N/A"
+        row = board.get_next_open_row(col)
+        board.drop_piece(row, col, player)
+        records.append(("move", [game_number, turn, labels[player], col, f"{duration:.4f}", nodes]))
+        if check_win_at(board, row, col, player):
+            winner = player
+            break
+
+    game_duration = time.perf_counter() - game_start_time
+    player_result, agent_result = {1: ("Win", "Loss"), 2: ("Loss", "Win"), None: ("Tie", "Tie")}[winner]
+    records.append(("game", [game_number, labels[2], player_result, agent_result,
+                             1 if winner == 1 else 0, 1 if winner == 2 else 0, f"{game_duration:.2f}", 1]))
+    return records
+
+async def play_games(client: AsyncGeminiClient, opponents: List, start_game_number: int = 1) -> List[Tuple[str, List]]:
+    # - One game per opponent (each game needs its own agent), all running at once, records in game order
+    games = await asyncio.gather(*(play_game(client, opponent, start_game_number + index)
+                                   for index, opponent in enumerate(opponents)))
+    return [record for records in games for record in records]
+
+if __name__ == "__main__":
+    from connect_four import RandomAgent
+
+    # - Offline demo: 8 concurrent games against the fake model, with a 429 every 10 requests
+    client = AsyncGeminiClient(FakeGeminiModel(latency=0.2, rate_limit_every=10, seed=1), requests_per_minute=600,
+                               cache_path=None, backoff_seconds=0.1)
+    start = time.perf_counter()
+    records = asyncio.run(play_games(client, [RandomAgent(seed) for seed in range(8)]))
+    games = [row for kind, row in records if kind == "game"]
+    print(f"{len(games)} games, {client.requests} requests ({client.rate_limited} rate limited, "
+          f"{client.cache_hits} cache hits) in {time.perf_counter() - start:.1f}s")
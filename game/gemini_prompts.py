@@ -0,0 +1,56 @@
+""" gemini_prompts.py
+  - This file contains the prompts sent to Gemini and the parsing of its answers
+  - They are shared by the blocking client in game/gemini.py and the asyncio client in game/gemini_async.py
+  - Nothing here talks to the API, so it can be imported without an API key or the SDK
+"""
+import re
+from typing import Optional
+
+# - These are all rules that I added as I found flaws in its reasonings. Add or remove rules as you wish
+rules = """Rules:
+- Player A uses pieces marked as A.
+- Player B uses pieces marked as B. You are player B.
+- Empty slots are marked as 0.
+- A player wins if they connect four of their pieces in a row, column, or diagonal.
+- As much as it is important for you to win, it is important to stop player A from getting close to winning. For example if a player A has 3 in a row, you must block them from getting the 4th.
+- You cannot place anything on a column that's full. If the top row of a column you pick has a number, avoid using that column.
+- Pick the best move that would let you as player B to win the game by connection 4 in a row. 
+- Stop player A from getting 4 in a row. For example, if you see the player has 3 'A's stacked, you must select that column to stop the player.
+- If a player A has 2 'A's in a row with an ability to place their piece on either side to make 4 in a row, make sure you block at least 1 side so it doesn't lead to a fork or a double threat.
+- If there is not enough room for you to create 4 in a row, there is no need to pursue that path.
+- If player A has 3 in a row, attempt to stop them at all costs. Consider all the locations that the player can place their next move. Remember, they can only stack them.
+- If a potential threat is surrounded by 'B's and there are no '0's for A to be placed to form 4 in a row, then it is not a threat.
+"""
+
+def analysis_prompt(printed: str) -> str:
+    return f"""You are a professional Connect 4 player. 
+
+{rules}
+
+Current Connect 4 Board:
+
+{printed}
+
+The bottom row represent the column number.
+
+Analyze the board and respond with what your best options are, that would prevent player A from winning and help you win, and explain your reasoning. Think hard. The column you pick must have at least 1 empty slot."""
+
+def column_prompt(response: str, columns: int) -> str:
+    return f"""You are a professional Connect 4 strategist.
+    
+{rules}
+
+Analyze the thought process and commentary below, and choose the BEST column number (1 to {columns}) for player B to play. Only return a single integer on its own line. Do not include any explanation.
+
+{response}
+"""
+
+def retry_prompt(prompt: str, failed_columns) -> str:
+    return prompt + f"\nThe previous model responded with the following columns but they are invalid: " + ", ".join(f'"{num}"' for num in failed_columns)
+
+def parse_column(text: str) -> Optional[int]:
+    # - First single digit 1-7 in the answer (1-based like the prompt), None if there is none
+    match = re.findall(r"\b[1-7]\b", text)
+    if match:
+        return int(match[0])
+    return None
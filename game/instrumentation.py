@@ -0,0 +1,178 @@
+""" instrumentation.py
+ - This file contains the opt-in profiling of one MinimaxAgent move (MinimaxAgent(profile=True))
+    - SearchProfile.measure wraps one get_move and records:
+        - nodes and leaves (positions scored by value) of the search
+        - cutoffs per ply (Alpha-Beta, negamax and the exact solver)
+        - the effective branching factor b*: the b that solves nodes = 1 + b + b^2 + ... + b^depth
+          (with iterative deepening the nodes of every iteration count and depth is the last finished one)
+        - hit rates of the transposition table and the solver cache during the move
+        - time spent in check_win, evaluate_board, result, get_valid_moves, make_move, undo_move and value
+    - The timed functions are swapped for dispatching wrappers in the search module while at least one profiled move
+      is running, and put back when the last one ends (reference counted under a lock). A wrapper only times the call
+      when the calling thread is inside a profiled move, so moves searched at the same time on other threads are
+      neither timed nor counted. With no profiled move running the module has its unchanged functions and pays nothing
+    - Times are exclusive: the time of a timed function called by another one (check_win inside make_move)
+      is only counted for the inner one, so the split adds up to at most the move time
+    - Only the calling process is timed: root moves searched by the worker processes of workers=N count
+      in nodes but not in the function times, leaves or cutoffs
+"""
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+TIMED_FUNCTIONS = ("check_win", "evaluate_board", "result", "get_valid_moves", "make_move", "undo_move", "value")
+
+# - The profile of the move running on each thread (active.profile, active.stack)
+active = threading.local()
+# - module: [profiled moves running, {name: original function}], changed only under install_lock
+installed = {}
+install_lock = threading.Lock()
+
+def dispatcher(name, function):
+    clock = time.perf_counter
+    def timed(*args, **kwargs):
+        profile = getattr(active, "profile", None)
+        if profile is None or name not in profile.timings:
+            return function(*args, **kwargs)
+        entry = profile.timings[name]
+        stack = active.stack
+        # - stack[-1] collects the time of timed functions called from this one
+        stack.append(0.0)
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            entry[0] += 1
+            entry[1] += elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+    return timed
+
+def install(module):
+    with install_lock:
+        if module in installed:
+            installed[module][0] += 1
+            return
+        originals = {name: getattr(module, name) for name in TIMED_FUNCTIONS}
+        for name, function in originals.items():
+            setattr(module, name, dispatcher(name, function))
+        installed[module] = [1, originals]
+
+def uninstall(module):
+    with install_lock:
+        installed[module][0] -= 1
+        if installed[module][0]:
+            return
+        for name, function in installed.pop(module)[1].items():
+            setattr(module, name, function)
+
+def effective_branching_factor(nodes: int, depth: Optional[int]) -> Optional[float]:
+    # - Bisection on 1 + b + ... + b^depth = nodes, see Russell & Norvig 3.6.1
+    if not depth or nodes <= 1:
+        return None
+    def tree_size(b):
+        return sum(b ** ply for ply in range(depth + 1))
+    low, high = 0.0, float(nodes)
+    for _ in range(100):
+        middle = (low + high) / 2
+        if tree_size(middle) < nodes:
+            low = middle
+        else:
+            high = middle
+    return (low + high) / 2
+
+class SearchProfile:
+    def __init__(self, functions=TIMED_FUNCTIONS):
+        self.functions = functions
+        self.nodes = 0
+        self.leaves = 0
+        self.depth = None
+        self.source = None
+        self.seconds = 0.0
+        self.cutoffs: Dict[int, int] = defaultdict(int)
+        # - name: [calls, exclusive seconds]
+        self.timings: Dict[str, list] = {name: [0, 0.0] for name in functions}
+        # - name: (probes, hits) during the move
+        self.caches: Dict[str, tuple] = {}
+
+    def measure(self, agent, node_counter):
+        return ProfiledMove(self, agent, node_counter)
+
+    @property
+    def ebf(self) -> Optional[float]:
+        return effective_branching_factor(self.nodes, self.depth)
+
+    def hit_rate(self, cache: str) -> Optional[float]:
+        probes, hits = self.caches.get(cache, (0, 0))
+        return hits / probes if probes else None
+
+    def as_dict(self) -> Dict:
+        return {
+            "source": self.source, "depth": self.depth, "nodes": self.nodes, "leaves": self.leaves,
+            "cutoffs": dict(sorted(self.cutoffs.items())), "ebf": self.ebf, "seconds": self.seconds,
+            "timings": {name: tuple(entry) for name, entry in self.timings.items()},
+            "caches": {name: {"probes": probes, "hits": hits, "hit_rate": self.hit_rate(name)}
+                       for name, (probes, hits) in self.caches.items()},
+        }
+
+    def report(self) -> str:
+        ebf = f"{self.ebf:.2f}" if self.ebf is not None else "-"
+        lines = [f"{self.source} depth {self.depth}: {self.nodes} nodes, {self.leaves} leaves, EBF {ebf}, {self.seconds * 1000:.1f} ms"]
+        if self.cutoffs:
+            lines.append("  cutoffs by ply: " + ", ".join(f"{ply}: {count}" for ply, count in sorted(self.cutoffs.items())))
+        for name, (probes, hits) in self.caches.items():
+            lines.append(f"  {name}: {hits}/{probes} hits ({hits / probes:.1%})" if probes else f"  {name}: not probed")
+        timed = 0.0
+        for name, (calls, seconds) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            if calls:
+                timed += seconds
+                lines.append(f"  {name:<16} {calls:>9} calls {seconds * 1000:>9.1f} ms {seconds / self.seconds:>6.1%}")
+        if self.seconds:
+            other = self.seconds - timed
+            lines.append(f"  {'other':<16} {'':>15} {other * 1000:>9.1f} ms {other / self.seconds:>6.1%}")
+        return "\n".join(lines)
+
+class ProfiledMove:
+    # - Context manager returned by SearchProfile.measure
+    def __init__(self, profile: SearchProfile, agent, node_counter):
+        self.profile = profile
+        self.agent = agent
+        self.node_counter = node_counter
+        self.module = sys.modules[type(agent).__module__]
+
+    def caches(self):
+        caches = {}
+        if self.agent.tt is not None:
+            caches["transposition"] = (self.agent.tt.probes, self.agent.tt.hits)
+        if self.agent.solver_cache is not None:
+            caches["solver"] = (self.agent.solver_cache.probes, self.agent.solver_cache.hits)
+        return caches
+
+    def __enter__(self):
+        # - The search adds to node_counter["cutoffs"] only when it is there
+        self.node_counter["cutoffs"] = self.profile.cutoffs
+        self.caches_before = self.caches()
+        # - The calls of this thread go to this profile, an outer profiled move of the same thread gets them back afterwards
+        self.outer = getattr(active, "profile", None), getattr(active, "stack", None)
+        active.profile, active.stack = self.profile, []
+        install(self.module)
+        self.start = time.perf_counter()
+        return self.profile
+
+    def __exit__(self, *exc_info):
+        profile = self.profile
+        profile.seconds = time.perf_counter() - self.start
+        uninstall(self.module)
+        active.profile, active.stack = self.outer
+        del self.node_counter["cutoffs"]
+        profile.nodes = self.node_counter["count"]
+        profile.leaves = profile.timings["value"][0] if "value" in profile.timings else 0
+        profile.depth = self.agent.last_depth
+        profile.source = self.agent.last_source
+        for name, (probes, hits) in self.caches().items():
+            probes_before, hits_before = self.caches_before.get(name, (0, 0))
+            profile.caches[name] = (probes - probes_before, hits - hits_before)
+        return False
@@ -0,0 +1,133 @@
+""" opening_book.py
+ - This file contains the opening book: best moves for every early position, searched once offline
+    - build_opening_book enumerates every position reachable within N plies of the empty board, searches each one
+      with a MinimaxAgent (spread over a process pool) and writes a sorted binary file
+    - The file is a 32-byte header (board rows, columns and connect-N, plies, search depth, record count) followed by fixed-size records (position hash: uint64, best move: uint8), sorted by hash
+    - Positions are keyed by their Zobrist hash (game.transposition). A position and its left-right mirror get a record
+      each: the search evaluation is not mirror-symmetric, so the mirror of a move searched on one of them is not
+      necessarily the move the search picks on the other
+    - OpeningBook reads the file through a read-only memory map and binary-searches it, so every process that opens
+      the book shares the same pages of the OS file cache and memory use doesn't grow with the number of workers
+    - Build from the command line:
+        python -m game.opening_book --plies 6 --depth 8 --out opening_book.bin
+"""
+import mmap
+import struct
+from typing import Dict, Optional
+
+from game.transposition import get_zobrist_keys
+
+BOOK_MAGIC = b"C4BOOK1\0"
+# - magic, rows, columns, plies, depth, record count, connect
+HEADER = struct.Struct("<8sBBBBQB")
+HEADER_SIZE = 32
+RECORD = struct.Struct("<QB")
+
+class OpeningBook:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, mode='rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.columns, self.plies, self.depth, self.count, self.connect = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        if not self.connect:
+            raise ValueError(f"{path} has no connect-N in its header, build it again")
+        self.keys = get_zobrist_keys(self.rows, self.columns)
+
+    def lookup(self, key: int) -> Optional[int]:
+        # - Binary search over the sorted records
+        low, high = 0, self.count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            record_key, move = RECORD.unpack_from(self.data, HEADER_SIZE + middle * RECORD.size)
+            if record_key == key:
+                return move
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def get_move(self, board, current_player: int) -> Optional[int]:
+        if board.rows != self.rows or board.columns != self.columns or board.connect != self.connect:
+            return None
+        return self.lookup(self.keys.hash_board(board, current_player))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __getstate__(self):
+        # - Worker processes reopen the file instead of copying the map
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+def enumerate_positions(plies: int, rows: int = 6, columns: int = 7, connect: int = 4) -> Dict[int, tuple]:
+    # - Every non-terminal position within plies moves of the empty board, keyed by hash: (grid, player to move)
+    from connect_four import initialize_board, get_valid_moves, make_move, is_terminal
+    from game.board import Board, create_empty_grid
+
+    keys = get_zobrist_keys(rows, columns)
+    positions = {}
+    frontier = [initialize_board(Board(rows, columns, create_empty_grid(rows, columns), connect), 1)]
+    for ply in range(plies + 1):
+        next_frontier = []
+        for state in frontier:
+            key = keys.hash_board(state['board'], state['current_player'])
+            if key in positions or is_terminal(state):
+                continue
+            positions[key] = ([row[:] for row in state['board'].grid], state['current_player'])
+            if ply < plies:
+                for move in get_valid_moves(state):
+                    child = initialize_board(Board(rows, columns, [row[:] for row in state['board'].grid], connect),
+                                             state['current_player'])
+                    next_frontier.append(make_move(child, move))
+        frontier = next_frontier
+    return positions
+
+def search_book_position(task):
+    key, grid, current_player, depth, connect = task
+    from connect_four import MinimaxAgent, initialize_board
+    from game.board import Board
+
+    agent = MinimaxAgent(max_depth=depth, use_alpha_beta=True, in_place=True, use_bitboard=True,
+                         incremental_eval=True, ordering="center", verbose=False)
+    move, _ = agent.get_move(initialize_board(Board(len(grid), len(grid[0]), grid, connect), current_player))
+    return key, move
+
+def build_opening_book(path: str, plies: int = 6, depth: int = 8, processes: Optional[int] = None,
+                       rows: int = 6, columns: int = 7, connect: int = 4) -> int:
+    import multiprocessing
+
+    positions = enumerate_positions(plies, rows, columns, connect)
+    tasks = [(key, grid, player, depth, connect) for key, (grid, player) in positions.items()]
+    with multiprocessing.Pool(processes) as pool:
+        moves = dict(pool.imap_unordered(search_book_position, tasks, chunksize=16))
+
+    records = sorted((key, move) for key, move in moves.items() if move is not None)
+    with open(path, mode='wb') as file:
+        file.write(HEADER.pack(BOOK_MAGIC, rows, columns, plies, depth, len(records), connect).ljust(HEADER_SIZE, b"\0"))
+        for key, move in records:
+            file.write(RECORD.pack(key, move))
+    return len(records)
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build the Connect 4 opening book")
+    parser.add_argument("--plies", type=int, default=6, help="positions up to this many moves into the game")
+    parser.add_argument("--depth", type=int, default=8, help="Alpha-Beta search depth for each position")
+    parser.add_argument("--out", default="opening_book.bin")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4, help="pieces in a line needed to win")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build_opening_book(args.out, args.plies, args.depth, args.workers, args.rows, args.columns, args.connect)
+    print(f"Wrote {count} positions to {args.out} in {time.perf_counter() - start:.1f}s")
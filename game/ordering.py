@@ -0,0 +1,90 @@
+""" ordering.py
+ - This file contains the move ordering used by the Alpha-Beta search
+    - Alpha-Beta prunes the most when the best move is searched first, but get_valid_moves returns columns 0..6
+    - MoveOrdering combines four heuristics, each can be turned on or off:
+        - center: static center-first order (3, 2, 4, 1, 5, 0, 6 on a 7-column board)
+        - hash_move: the best move stored in the transposition table for this position. The search puts it first
+          itself when the policy leaves it out, so with a transposition table every policy tries it first
+        - killers: up to two moves per ply that caused a cutoff in a sibling position
+        - history: a score per (player, column) that grows every time the move causes a cutoff
+    - ORDERING_POLICIES maps the names accepted by MinimaxAgent(ordering=...) to a set of heuristics
+"""
+from typing import List, Optional
+
+KILLER_SLOTS = 2
+
+ORDERING_POLICIES = {
+    "none": {},
+    "center": {"center": True},
+    "hash": {"center": True, "hash_move": True},
+    "killers": {"center": True, "killers": True},
+    "history": {"center": True, "history": True},
+    "all": {"center": True, "hash_move": True, "killers": True, "history": True},
+}
+
+def center_first(columns: int) -> List[int]:
+    # - Columns sorted by distance to the middle, left before right on ties
+    middle = (columns - 1) / 2
+    return sorted(range(columns), key=lambda col: (abs(col - middle), col))
+
+class MoveOrdering:
+    def __init__(self, center=False, hash_move=False, killers=False, history=False):
+        self.center = center
+        self.hash_move = hash_move
+        self.killers = killers
+        self.history = history
+        # - killer_moves[ply] holds the latest cutoff moves at that ply, newest first
+        self.killer_moves: List[List[int]] = []
+        # - history_scores[player][column]
+        self.history_scores = {1: {}, 2: {}}
+        self.center_ranks = {}
+
+    def new_search(self):
+        # - Killers only make sense for the search they were found in, history is aged instead of dropped
+        self.killer_moves = []
+        for scores in self.history_scores.values():
+            for col in scores:
+                scores[col] //= 2
+
+    def order(self, state, moves: List[int], ply: int, hash_move: Optional[int] = None) -> List[int]:
+        if self.center:
+            columns = state['board'].columns
+            ranks = self.center_ranks.get(columns)
+            if ranks is None:
+                ranks = {col: rank for rank, col in enumerate(center_first(columns))}
+                self.center_ranks[columns] = ranks
+            moves.sort(key=ranks.__getitem__)
+        if self.history:
+            scores = self.history_scores[state['current_player']]
+            # - Stable sort, moves without history keep the center order
+            moves.sort(key=lambda col: -scores.get(col, 0))
+        if self.killers and ply < len(self.killer_moves):
+            for killer in reversed(self.killer_moves[ply]):
+                if killer in moves:
+                    moves.remove(killer)
+                    moves.insert(0, killer)
+        if self.hash_move and hash_move is not None and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return moves
+
+    def record_cutoff(self, state, move: int, ply: int, remaining_depth: int):
+        if self.killers:
+            while len(self.killer_moves) <= ply:
+                self.killer_moves.append([])
+            slots = self.killer_moves[ply]
+            if move in slots:
+                slots.remove(move)
+            slots.insert(0, move)
+            del slots[KILLER_SLOTS:]
+        if self.history:
+            scores = self.history_scores[state['current_player']]
+            # - Cutoffs close to the root save the most work
+            scores[move] = scores.get(move, 0) + remaining_depth * remaining_depth
+
+def make_ordering(policy: Optional[str]) -> Optional[MoveOrdering]:
+    if policy is None:
+        return None
+    if policy not in ORDERING_POLICIES:
+        raise ValueError(f"Unknown move ordering '{policy}'. Choose one of: {', '.join(ORDERING_POLICIES)}")
+    return MoveOrdering(**ORDERING_POLICIES[policy])
@@ -0,0 +1,152 @@
+""" position_log.py
+ - This file contains the binary format for labelled positions written by self_play.py
+    - Positions go into a directory of shards (positions-00000.c4pos, positions-00001.c4pos, ...). A new shard is started
+      once the current one holds max_records records, a shard is only ever appended to
+    - A shard is a 32-byte header (magic, rows, columns, connect, record size) followed by fixed-size 32-byte records:
+        - the two BitBoard player masks (uint64 each, see game.bitboard), so boards up to 7x8 fit
+        - the label: the score of the deeper search from player 1's view (float32, +inf / -inf for a forced win)
+          and the best move it found (uint8, 255 if none)
+        - the game number (uint32), the player to move, the ply, the depth of the label search (uint8 each)
+        - the result of the game for the player to move (int8: 1 win, 0 draw, -1 loss)
+    - PositionShard reads a shard through a read-only memory map: records are unpacked one at a time on access, so
+      reading any number of shards takes constant memory. as_array gives the same records as a NumPy structured array
+      without a copy (only when NumPy is installed)
+    - ShardWriter keeps one shard open, truncate_to cuts a shard back to a known size when a run is resumed
+"""
+import mmap
+import os
+import struct
+from typing import Iterator, List, Tuple
+
+from game.bitboard import BitBoard
+
+SHARD_MAGIC = b"C4POS1\0\0"
+SHARD_EXTENSION = ".c4pos"
+# - magic, rows, columns, connect, record size
+SHARD_HEADER = struct.Struct("<8sBBBB")
+SHARD_HEADER_SIZE = 32
+# - player 1 mask, player 2 mask, score, game, player, ply, move, depth, result
+RECORD = struct.Struct("<QQfIBBBBb3x")
+RECORD_FIELDS = ("player_one", "player_two", "score", "game", "player", "ply", "move", "depth", "result")
+NO_MOVE = 255
+
+def shard_path(directory: str, index: int) -> str:
+    return os.path.join(directory, f"positions-{index:05d}{SHARD_EXTENSION}")
+
+def list_shards(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SHARD_EXTENSION))
+
+def bitboard_from_masks(player_one: int, player_two: int, rows: int = 6, columns: int = 7, connect: int = 4) -> BitBoard:
+    # - The masks don't store the move order, heights are rebuilt from the occupied bits of each column
+    bitboard = BitBoard(rows, columns, connect)
+    bitboard.masks = [player_one, player_two]
+    occupied = player_one | player_two
+    column_mask = (1 << bitboard.column_height) - 1
+    bitboard.heights = [(occupied >> (col * bitboard.column_height) & column_mask).bit_length() for col in range(columns)]
+    return bitboard
+
+class PositionShard:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, mode='rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.rows, self.columns, self.connect, record_size = SHARD_HEADER.unpack_from(self.data, 0)
+        if magic != SHARD_MAGIC or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a position shard")
+        # - A record cut off by a crash at the end of the file is not counted
+        self.count = (len(self.data) - SHARD_HEADER_SIZE) // RECORD.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> Tuple:
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self.data, SHARD_HEADER_SIZE + index * RECORD.size)
+
+    def __iter__(self) -> Iterator[Tuple]:
+        for index in range(self.count):
+            yield RECORD.unpack_from(self.data, SHARD_HEADER_SIZE + index * RECORD.size)
+
+    def board(self, record: Tuple) -> BitBoard:
+        return bitboard_from_masks(record[0], record[1], self.rows, self.columns, self.connect)
+
+    def as_array(self):
+        import numpy as np
+        dtype = np.dtype({"names": list(RECORD_FIELDS),
+                          "formats": ["<u8", "<u8", "<f4", "<u4", "u1", "u1", "u1", "u1", "i1"],
+                          "offsets": [0, 8, 16, 20, 24, 25, 26, 27, 28], "itemsize": RECORD.size})
+        return np.frombuffer(self.data, dtype=dtype, count=self.count, offset=SHARD_HEADER_SIZE)
+
+    def close(self):
+        try:
+            self.data.close()
+        except BufferError:
+            # - An array from as_array still points into the map, it is unmapped once that array is gone
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_positions(directory: str) -> Iterator[Tuple[PositionShard, Tuple]]:
+    # - Every record of every shard in order, one shard mapped at a time
+    for path in list_shards(directory):
+        with PositionShard(path) as shard:
+            for record in shard:
+                yield shard, record
+
+def truncate_to(path: str, size: int):
+    # - Drops whatever was appended after size bytes (records written after the last checkpoint)
+    with open(path, mode='r+b') as file:
+        file.truncate(size)
+
+class ShardWriter:
+    def __init__(self, directory: str, rows: int = 6, columns: int = 7, connect: int = 4, max_records: int = 1 << 20,
+                 shard: int = 0):
+        if columns * (rows + 1) > 64:
+            raise ValueError(f"A {rows}x{columns} board doesn't fit in the 64-bit masks of a position record")
+        self.directory = directory
+        self.rows = rows
+        self.columns = columns
+        self.connect = connect
+        self.max_records = max_records
+        self.shard = shard
+        self.file = None
+        os.makedirs(directory, exist_ok=True)
+        self.open_shard()
+
+    def open_shard(self):
+        path = shard_path(self.directory, self.shard)
+        is_new = not os.path.exists(path) or os.stat(path).st_size == 0
+        self.file = open(path, mode='ab')
+        if is_new:
+            self.file.write(SHARD_HEADER.pack(SHARD_MAGIC, self.rows, self.columns, self.connect, RECORD.size)
+                            .ljust(SHARD_HEADER_SIZE, b"\0"))
+        self.count = (self.file.tell() - SHARD_HEADER_SIZE) // RECORD.size
+
+    def write(self, records: List[Tuple]):
+        # - Records of one game stay in one shard, a new shard is started before the game if this one is full
+        if self.count and self.count + len(records) > self.max_records:
+            self.flush()
+            self.file.close()
+            self.shard += 1
+            self.open_shard()
+        self.file.write(b"".join(RECORD.pack(*record) for record in records))
+        self.count += len(records)
+
+    def flush(self) -> Tuple[int, int]:
+        # - Returns (shard index, shard size in bytes): everything up to there is on disk
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.shard, self.file.tell()
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.file.flush()
+            self.file.close()
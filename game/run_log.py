@@ -0,0 +1,145 @@
+""" run_log.py
+ - This file contains the buffered CSV logging used for performance_log.csv and game_result.csv
+    - BufferedCsvWriter keeps one file open for the whole run and holds rows in memory,
+      they are written in one batch once max_rows rows are waiting or flush_seconds have passed, and when the writer is closed
+    - RunLogger owns the writers for the move log and the game log and closes them at interpreter exit
+    - The next game number is kept in a small sidecar file next to the move log (performance_log.csv.next),
+      so start-up doesn't have to read the whole log. The sidecar also holds the size of the move log when it was written:
+      batches flushed by size or time after that (and never followed by a sidecar update, e.g. after a hard kill) change
+      the size, so the log is scanned once again. Same when the sidecar is missing
+    - Log paths ending in .c4col are written in the columnar binary format of game.columnar_log instead of CSV
+"""
+import atexit
+import csv
+import os
+import time
+from typing import List
+
+from game.columnar_log import ColumnarWriter, COLUMNAR_EXTENSION, MOVE_LOG_SCHEMA, GAME_LOG_SCHEMA, read_chunks
+
+MOVE_LOG_HEADER = [name for name, _ in MOVE_LOG_SCHEMA]
+GAME_LOG_HEADER = [name for name, _ in GAME_LOG_SCHEMA]
+
+class BufferedCsvWriter:
+    def __init__(self, path: str, header: List[str], max_rows: int = 500, flush_seconds: float = 5.0):
+        self.path = path
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        is_new = not os.path.exists(path) or os.stat(path).st_size == 0
+        self.file = open(path, mode='a', newline='')
+        self.writer = csv.writer(self.file)
+        if is_new:
+            self.writer.writerow(header)
+        self.rows: List[List] = []
+        self.last_flush = time.monotonic()
+
+    def write(self, row: List):
+        self.rows.append(row)
+        if len(self.rows) >= self.max_rows or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            self.writer.writerows(self.rows)
+            self.rows = []
+        self.file.flush()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+def sidecar_path(move_log: str) -> str:
+    return move_log + ".next"
+
+def scan_next_game_number(filename: str) -> int:
+    # - The old way: read every row of the log, only used when the sidecar is missing or out of date
+    if not os.path.exists(filename) or os.stat(filename).st_size == 0:
+        return 1
+    if filename.endswith(COLUMNAR_EXTENSION):
+        return max((max(chunk["GameNum"], default=0) for chunk in read_chunks(filename)), default=0) + 1
+    with open(filename, mode='r') as file:
+        reader = csv.reader(file)
+        next(reader)  # skip header
+        last_game = 0
+        for row in reader:
+            try:
+                last_game = max(last_game, int(row[0]))
+            except (ValueError, IndexError):
+                continue
+        return last_game + 1
+
+def log_size(move_log: str) -> int:
+    return os.stat(move_log).st_size if os.path.exists(move_log) else 0
+
+def read_next_game_number(move_log: str) -> int:
+    # - Sidecar: "next game number, size of the move log"
+    try:
+        with open(sidecar_path(move_log), mode='r') as file:
+            next_game, size = (int(value) for value in file.read().split(","))
+        if size == log_size(move_log):
+            return next_game
+    except (FileNotFoundError, ValueError):
+        pass
+    next_game = scan_next_game_number(move_log)
+    write_next_game_number(move_log, next_game)
+    return next_game
+
+def write_next_game_number(move_log: str, next_game: int):
+    # - Call it once everything logged so far is flushed, the size of the log at that point is stored with the number.
+    #   Write to a temporary file first so a crash never leaves a half-written sidecar behind
+    path = sidecar_path(move_log)
+    with open(path + ".tmp", mode='w') as file:
+        file.write(f"{next_game},{log_size(move_log)}")
+    os.replace(path + ".tmp", path)
+
+def open_log_writer(path: str, header: List[str], schema, max_rows: int, flush_seconds: float):
+    if path.endswith(COLUMNAR_EXTENSION):
+        # - Columnar chunks are only worth it when they are large, so they are cut by size only
+        return ColumnarWriter(path, schema, max(max_rows, 4096))
+    return BufferedCsvWriter(path, header, max_rows, flush_seconds)
+
+class RunLogger:
+    def __init__(self, move_log: str = "performance_log.csv", game_log: str = "game_result.csv",
+                 max_rows: int = 500, flush_seconds: float = 5.0):
+        self.move_log = move_log
+        self.next_game = read_next_game_number(move_log)
+        self.moves = open_log_writer(move_log, MOVE_LOG_HEADER, MOVE_LOG_SCHEMA, max_rows, flush_seconds)
+        self.games = open_log_writer(game_log, GAME_LOG_HEADER, GAME_LOG_SCHEMA, max_rows, flush_seconds)
+        self.closed = False
+        atexit.register(self.close)
+
+    def log_move(self, row: List):
+        self.moves.write(row)
+        self.note_game_number(row[0])
+
+    def log_game(self, row: List):
+        self.games.write(row)
+        self.note_game_number(row[0])
+
+    def note_game_number(self, game_number):
+        try:
+            self.next_game = max(self.next_game, int(game_number) + 1)
+        except ValueError:
+            pass
+
+    def flush(self):
+        self.moves.flush()
+        self.games.flush()
+        write_next_game_number(self.move_log, self.next_game)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.moves.close()
+        self.games.close()
+        write_next_game_number(self.move_log, self.next_game)
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
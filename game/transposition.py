@@ -0,0 +1,144 @@
+""" transposition.py
+ - This file contains the Zobrist hashing and the transposition table used by the Alpha-Beta search
+    - ZobristKeys holds one random 64-bit key per (piece, row, column) plus one key for the side to move
+    - The hash of a position is the XOR of the keys of every piece on the board, so make_move and undo_move
+      can update it with a single XOR instead of rehashing the board
+    - Connect 4 is symmetric left to right, so a position and its mirror have the same game value. canonical_key picks the
+      smaller of the two hashes, so SolverCache (which stores values, no moves) keeps one entry for both. The solver
+      keeps its mirror hash up to date the same way, with the key of the mirrored cell
+    - The transposition table and the opening book are keyed on the plain hash and don't share mirrored entries: the
+      heuristic evaluate_board is not mirror-symmetric (its NW-SE diagonal windows wrap around the right edge of the
+      board), so a score or best move searched on the mirror is not valid for the position itself
+    - TranspositionTable stores, for each position, the searched depth, the bound type (exact/lower/upper),
+      the score and the best move
+    - The table has a fixed number of slots (size cap). A slot is overwritten when it is empty, holds the same position,
+      was written during an older search, or holds a shallower search than the new entry (depth-preferred with aging)
+    - SolverCache is the cache of the exact endgame solver: a fixed number of slots indexed by hash, a new entry always
+      overwrites the slot (lossy). Solved values don't depend on depth or on the search they came from, so it is never aged
+"""
+import random
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# - Fixed seed so hashes are the same in every process and every run
+ZOBRIST_SEED = 468
+
+# - Bound types stored with each entry
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class ZobristKeys:
+    def __init__(self, rows: int = 6, columns: int = 7, seed: int = ZOBRIST_SEED):
+        rng = random.Random(seed)
+        self.rows = rows
+        self.columns = columns
+        # - piece_keys[piece][row][col], index 0 is unused since empty cells don't contribute
+        self.piece_keys = [
+            [[rng.getrandbits(64) for _ in range(columns)] for _ in range(rows)]
+            for _ in range(3)
+        ]
+        # - XORed in when player 2 is to move
+        self.side_key = rng.getrandbits(64)
+
+    def hash_board(self, board, current_player: int) -> int:
+        key = self.side_key if current_player == 2 else 0
+        grid = board.grid
+        for row in range(self.rows):
+            for col in range(self.columns):
+                piece = grid[row][col]
+                if piece != 0:
+                    key ^= self.piece_keys[piece][row][col]
+        return key
+
+    def hash_mirror(self, board, current_player: int) -> int:
+        # - Hash of the left-right mirror of the board, without building the mirrored board
+        key = self.side_key if current_player == 2 else 0
+        grid = board.grid
+        last = self.columns - 1
+        for row in range(self.rows):
+            for col in range(self.columns):
+                piece = grid[row][col]
+                if piece != 0:
+                    key ^= self.piece_keys[piece][row][last - col]
+        return key
+
+    def move_key(self, row: int, col: int, piece: int) -> int:
+        # - Key to XOR in (or out) when piece is dropped at (row, col), including the change of side to move
+        return self.piece_keys[piece][row][col] ^ self.side_key
+
+def canonical_key(key: int, mirror_key: int) -> Tuple[int, bool]:
+    # - Returns (canonical key, True if it is the mirror's key)
+    if mirror_key < key:
+        return mirror_key, True
+    return key, False
+
+@lru_cache(maxsize=None)
+def get_zobrist_keys(rows: int = 6, columns: int = 7) -> ZobristKeys:
+    # - One set of keys per board size, shared by every search in the process
+    return ZobristKeys(rows, columns)
+
+class TranspositionTable:
+    def __init__(self, size: int = 1 << 20):
+        self.size = size
+        # - Each slot holds (key, depth, flag, score, best_move, generation) or None
+        self.slots = [None] * size
+        # - Incremented for every new search, entries from older searches are replaced first
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int, float, Optional[int]]]:
+        # - Returns (depth, flag, score, best_move) if the position is stored
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1], entry[2], entry[3], entry[4]
+
+    def store(self, key: int, depth: int, flag: int, score: float, best_move: Optional[int]):
+        index = key % self.size
+        entry = self.slots[index]
+        if entry is None or entry[0] == key or entry[5] != self.generation or depth >= entry[1]:
+            self.slots[index] = (key, depth, flag, score, best_move, self.generation)
+            self.stores += 1
+
+    def __len__(self):
+        return sum(1 for entry in self.slots if entry is not None)
+
+class SolverCache:
+    def __init__(self, size: int = 1 << 18):
+        self.size = size
+        # - Each slot holds (key, flag, value) or None, value is 1 (win), 0 (draw) or -1 (loss) for the player to move
+        self.slots = [None] * size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int) -> Optional[Tuple[int, int]]:
+        # - Returns (flag, value) if the position is stored
+        self.probes += 1
+        entry = self.slots[key % self.size]
+        if entry is None or entry[0] != key:
+            return None
+        self.hits += 1
+        return entry[1], entry[2]
+
+    def store(self, key: int, flag: int, value: int):
+        self.slots[key % self.size] = (key, flag, value)
+
+    def clear(self):
+        self.slots = [None] * self.size
+        self.probes = 0
+        self.hits = 0
@@ -6,9 +6,13 @@
     - The class has methods to draw the inner shadow and smooth circle 
     - The class has methods to update the display
     - The class has methods to handle the UI events
+    - The board overlay (the board with its holes, borders and shadows) doesn't change during a game, so it is rendered
+      once per board size and colors and reused: pieces are drawn on the screen and the overlay is blitted on top of them
+    - The drop animation only redraws and updates (pygame.display.update(rects)) the part of the screen the falling piece
+      moves through, instead of the whole window on every frame
 """
 import pygame
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 from game.board import Board
 
 try:
@@ -24,6 +28,23 @@ def draw_smooth_circle(screen: pygame.Surface, posx: int, posy: int, radius: int
     else:
         pygame.draw.circle(screen, color, (posx, posy), radius)
 
+# - Inner shadow surfaces by (radius, offset), every hole of a board uses the same one
+shadow_cache: Dict[Tuple[int, Tuple[int, int]], pygame.Surface] = {}
+
+# - Board overlays by board geometry and colors, see UIBuilder.get_overlay
+overlay_cache: Dict[tuple, pygame.Surface] = {}
+
+def get_inner_shadow(radius: int, offset: Tuple[int, int]) -> pygame.Surface:
+    key = (radius, tuple(offset))
+    circle_surf = shadow_cache.get(key)
+    if circle_surf is None:
+        circle_surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(circle_surf, (50,50,50, 100), (radius, radius), radius)
+
+        pygame.draw.circle(circle_surf, (0, 0, 0, 0), (radius + offset[0], radius + offset[1]), radius)
+        shadow_cache[key] = circle_surf
+    return circle_surf
+
 def draw_inner_shadow_circle(
     screen: pygame.Surface,
     posx: int,
@@ -31,12 +52,7 @@ def draw_inner_shadow_circle(
     radius: int,
     offset: Tuple[int, int]
 ):
-    circle_surf = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-    pygame.draw.circle(circle_surf, (50,50,50, 100), (radius, radius), radius)
-
-    pygame.draw.circle(circle_surf, (0, 0, 0, 0), (radius + offset[0], radius + offset[1]), radius)
-    
-    screen.blit(circle_surf, (posx - radius, posy - radius))
+    screen.blit(get_inner_shadow(radius, offset), (posx - radius, posy - radius))
 
 class UIBuilder:
     def __init__(
@@ -79,9 +95,14 @@ class UIBuilder:
 
         self.size = (self.width, self.height)
         self.radius = int(self.circle_size / 2 - self.margin)
+        self.font = None
 
-    def update_display(self):
-        pygame.display.update()
+    def update_display(self, rects: Optional[List[pygame.Rect]] = None):
+        # - rects: only update these parts of the window (dirty rects), the whole window if None
+        if rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
 
     def draw_background(self, screen: pygame.Surface) -> None:
         pygame.draw.rect(screen, self.background_color, (0, 0, self.width, self.height))
@@ -89,27 +110,38 @@ class UIBuilder:
     def draw_top_background(self, screen: pygame.Surface) -> None:
         pygame.draw.rect(screen, self.background_color, (0, 0, self.width, self.circle_size))
 
+    def draw_thinking(self, screen: pygame.Surface, text: str, frame: int, color: Tuple[int, int, int] = (255, 255, 255)) -> pygame.Rect:
+        # - "<text>..." in the top strip with the dots cycling every 10 frames, returns the rect to update
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", 60)
+        self.draw_top_background(screen)
+        label = self.font.render(text + "." * (frame // 10 % 4), True, color)
+        screen.blit(label, (40, 10))
+        return pygame.Rect(0, 0, self.width, self.circle_size)
+
     def draw_top_piece(self, screen: pygame.Surface, posx: int, player: int) -> None:
         color = self.player_one_color if player == 1 else self.player_two_color
         draw_smooth_circle(screen, posx, int(self.circle_size / 2), self.radius, color)
 
-    def draw_board(self, screen: pygame.Surface) -> None:
+    def cell_center(self, row: int, col: int) -> Tuple[int, int]:
+        posx = int(col * self.circle_size + self.circle_size / 2 + self.padding)
+        posy = int((row + 1) * self.circle_size + self.circle_size / 2 + self.padding)
+        return posx, posy
+
+    def get_overlay(self) -> pygame.Surface:
+        # - The board with empty holes, rendered once per geometry and colors and shared by every UIBuilder
+        key = (self.rows, self.columns, self.circle_size, self.margin, self.padding, self.border_thickness,
+               self.shadow_thickness, self.board_color)
+        overlay = overlay_cache.get(key)
+        if overlay is not None:
+            return overlay
+
         board_surf = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
         board_surf.fill(self.board_color)
-        
+
         for c in range(self.columns):
             for r in range(self.rows):
-                circle_rect = pygame.Rect(
-                    c * self.circle_size + self.padding,
-                    (r + 1) * self.circle_size + self.padding,
-                    self.circle_size,
-                    self.circle_size,
-                )
-                pygame.draw.rect(board_surf, self.board_color, circle_rect)
-                
-                piece = self.board.grid[r][c]
-                posx = int(c * self.circle_size + self.circle_size / 2 + self.padding)
-                posy = int((r + 1) * self.circle_size + self.circle_size / 2 + self.padding)
+                posx, posy = self.cell_center(r, c)
 
                 shadow_color = (50, 50, 50)
                 pygame.draw.rect(board_surf, (0, 0, 0, 0), (0, 0, self.width, self.circle_size))
@@ -120,13 +152,8 @@ class UIBuilder:
                 # - Border for hole
                 pygame.draw.circle(board_surf, (47, 112, 252), (posx, posy), self.radius + self.border_thickness)
 
-                if piece == 0:
-                    # - Circle cut out (the hole)
-                    pygame.draw.circle(board_surf, (0, 0, 0, 0), (posx, posy), self.radius)
-                else:
-                    # - Player piece on board
-                    color = self.player_one_color if piece == 1 else self.player_two_color
-                    pygame.draw.circle(board_surf, color, (posx, posy), self.radius)
+                # - Circle cut out (the hole), pieces are drawn below the overlay and show through it
+                pygame.draw.circle(board_surf, (0, 0, 0, 0), (posx, posy), self.radius)
 
                 # - Inner shadow for hole
                 draw_inner_shadow_circle(
@@ -136,8 +163,35 @@ class UIBuilder:
                     self.radius,
                     (self.shadow_thickness - 1, self.shadow_thickness - 1)
                 )
-        
-        screen.blit(board_surf, (0, 0))
+
+        if pygame.display.get_surface() is not None:
+            board_surf = board_surf.convert_alpha()
+        overlay_cache[key] = board_surf
+        return board_surf
+
+    def draw_pieces(self, screen: pygame.Surface) -> None:
+        for c in range(self.columns):
+            for r in range(self.rows):
+                piece = self.board.grid[r][c]
+                if piece != 0:
+                    color = self.player_one_color if piece == 1 else self.player_two_color
+                    pygame.draw.circle(screen, color, self.cell_center(r, c), self.radius)
+
+    def draw_board(self, screen: pygame.Surface) -> None:
+        self.draw_pieces(screen)
+        screen.blit(self.get_overlay(), (0, 0))
+
+    def draw_cell(self, screen: pygame.Surface, row: int, col: int) -> pygame.Rect:
+        # - Redraws one cell of the board (e.g. right after a piece is dropped there), returns the rect to update
+        rect = pygame.Rect(col * self.circle_size + self.padding, (row + 1) * self.circle_size + self.padding,
+                           self.circle_size, self.circle_size)
+        pygame.draw.rect(screen, self.background_color, rect)
+        piece = self.board.grid[row][col]
+        if piece != 0:
+            color = self.player_one_color if piece == 1 else self.player_two_color
+            pygame.draw.circle(screen, color, self.cell_center(row, col), self.radius)
+        screen.blit(self.get_overlay(), rect, rect)
+        return rect
 
     def animate_piece_drop(self, screen: pygame.Surface, col: int, piece: int, target_row: int, gravity = 3.0, damping = 0.2, bounce_threshold = 2.0) -> None:
         if (self.instant_animations):
@@ -151,7 +205,17 @@ class UIBuilder:
         velocity = 0.0
         posx = int(col * self.circle_size + self.circle_size / 2 + self.padding)
         color = self.player_one_color if piece == 1 else self.player_two_color
+        overlay = self.get_overlay()
+
+        # - Everything below the overlay except the falling piece, drawn once for the whole animation
+        under = pygame.Surface(self.size)
+        self.draw_background(under)
+        self.draw_pieces(under)
+        screen.blit(under, (0, 0))
+        screen.blit(overlay, (0, 0))
+        self.update_display()
 
+        previous_rect = None
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
@@ -167,10 +231,12 @@ class UIBuilder:
                     current_y = final_y
                     break
 
-            self.draw_background(screen)
-            self.draw_top_background(screen)
+            # - Only the strip the piece moved through since the last frame is redrawn and updated
+            piece_rect = pygame.Rect(posx - self.radius - 1, int(current_y) - self.radius - 1, 2 * self.radius + 3, 2 * self.radius + 3)
+            dirty = piece_rect if previous_rect is None else piece_rect.union(previous_rect)
+            screen.blit(under, dirty, dirty)
             draw_smooth_circle(screen, posx, int(current_y), self.radius, color)
-            self.draw_board(screen)
-            self.update_display()
+            screen.blit(overlay, dirty, dirty)
+            self.update_display([dirty])
+            previous_rect = piece_rect
             clock.tick(60)
-
@@ -0,0 +1,84 @@
+""" log_analysis.py
+ - This file contains the streaming version of the summaries in results.py, for logs too large to load with pandas
+    - The logs are read one chunk at a time (game.columnar_log), from either the CSV logs or the columnar .c4col logs,
+      and only a few running totals per agent are kept, so memory stays flat however long the logs get
+    - summarize_moves: moves, average time per move and average nodes per move for each agent
+    - summarize_games: games, wins, draws, losses, win rate and average game time for each agent
+    - Times are used as logged, like in results.py
+    - Usage: python log_analysis.py [move_log] [game_log]   (defaults: performance_log.csv game_result.csv)
+"""
+import math
+import sys
+from typing import Dict, Iterable
+
+from game.columnar_log import read_log_chunks, MOVE_LOG_SCHEMA, GAME_LOG_SCHEMA
+
+def summarize_moves(chunks: Iterable[Dict[str, list]]) -> Dict[str, Dict]:
+    totals: Dict[str, Dict] = {}
+    for chunk in chunks:
+        for agent, seconds, nodes in zip(chunk["AgentUsed"], chunk["Time(s)"], chunk["Nodes"]):
+            entry = totals.get(agent)
+            if entry is None:
+                entry = totals[agent] = {"moves": 0, "time_sum": 0.0, "time_count": 0, "nodes_sum": 0.0, "nodes_count": 0}
+            entry["moves"] += 1
+            if not math.isnan(seconds):
+                entry["time_sum"] += seconds
+                entry["time_count"] += 1
+            if not math.isnan(nodes):
+                entry["nodes_sum"] += nodes
+                entry["nodes_count"] += 1
+
+    summary = {}
+    for agent, entry in totals.items():
+        summary[agent] = {
+            "moves": entry["moves"],
+            "avg_time": entry["time_sum"] / entry["time_count"] if entry["time_count"] else math.nan,
+            "avg_nodes": entry["nodes_sum"] / entry["nodes_count"] if entry["nodes_count"] else math.nan,
+        }
+    return summary
+
+def summarize_games(chunks: Iterable[Dict[str, list]]) -> Dict[str, Dict]:
+    totals: Dict[str, Dict] = {}
+    for chunk in chunks:
+        for agent, result, game_time in zip(chunk["AgentUsed"], chunk["AgentResult"], chunk["GameTime"]):
+            agent = agent.strip()
+            entry = totals.get(agent)
+            if entry is None:
+                entry = totals[agent] = {"games": 0, "Win": 0, "Tie": 0, "Loss": 0, "time_sum": 0.0, "time_count": 0}
+            entry["games"] += 1
+            if result in entry:
+                entry[result] += 1
+            if not math.isnan(game_time):
+                entry["time_sum"] += game_time
+                entry["time_count"] += 1
+
+    summary = {}
+    for agent, entry in totals.items():
+        summary[agent] = {
+            "games": entry["games"],
+            "wins": entry["Win"],
+            "draws": entry["Tie"],
+            "losses": entry["Loss"],
+            "win_rate": entry["Win"] / entry["games"] * 100,
+            "avg_game_time": entry["time_sum"] / entry["time_count"] if entry["time_count"] else math.nan,
+        }
+    return summary
+
+def analyze(move_log: str = "performance_log.csv", game_log: str = "game_result.csv"):
+    moves = summarize_moves(read_log_chunks(move_log, MOVE_LOG_SCHEMA))
+    games = summarize_games(read_log_chunks(game_log, GAME_LOG_SCHEMA))
+    return moves, games
+
+if __name__ == "__main__":
+    move_summary, game_summary = analyze(*sys.argv[1:3])
+
+    print("=== Move-Level Summary ===")
+    print(f"{'Agent':<24} {'Moves':>8} {'Time(s)':>10} {'Nodes':>12}")
+    for agent, entry in sorted(move_summary.items()):
+        print(f"{agent:<24} {entry['moves']:>8} {entry['avg_time']:>10.4f} {entry['avg_nodes']:>12.1f}")
+
+    print("\n=== Game-Level Summary ===")
+    print(f"{'Agent':<24} {'Games':>6} {'Win':>5} {'Tie':>5} {'Loss':>5} {'Win %':>7} {'GameTime':>9}")
+    for agent, entry in sorted(game_summary.items()):
+        print(f"{agent:<24} {entry['games']:>6} {entry['wins']:>5} {entry['draws']:>5} {entry['losses']:>5} "
+              f"{entry['win_rate']:>7.1f} {entry['avg_game_time']:>9.2f}")
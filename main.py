@@ -7,36 +7,47 @@ Connect 4 Game with Pygame and Minimax AI
 - The game uses the Minimax algorithm with Alpha-Beta pruning to determine the best move for the AI
 - The game has a UI that displays the game board, pieces, and player turns
 """
-import os
+from __future__ import annotations
 import sys
 import math
 import random
-import pygame
 import time
-import csv
 
 # Global for tracking performance
 LOG_RESULTS = True
 CSV_FILENAME = "performance_log.csv"
- 
+GAME_RESULTS_FILENAME = "game_result.csv"
+
+from game.run_log import RunLogger, read_next_game_number
+
 def get_last_game_number(filename):
-    if not os.path.exists(filename) or os.stat(filename).st_size == 0:
-        return 1
-    with open(filename, mode='r') as file:
-        reader = csv.reader(file)
-        next(reader)  # skip header
-        last_game = 0
-        for row in reader:
-            try:
-                last_game = max(last_game, int(row[0]))
-            except:
-                continue
-        return last_game + 1
-
-from connect_four import initialize_board, MinimaxAgent
+    # - Read from the sidecar next to the log, the log itself is only scanned if the sidecar doesn't exist yet
+    return read_next_game_number(filename)
+
+# - One buffered logger per run, files stay open and rows are written in batches (flushed at exit)
+run_logger = None
+
+def get_run_logger() -> RunLogger:
+    global run_logger
+    if run_logger is None:
+        run_logger = RunLogger(CSV_FILENAME, GAME_RESULTS_FILENAME)
+    return run_logger
+
+from connect_four import initialize_board, MinimaxAgent, RandomAgent
+from simulation import run_games, write_records
 from game.board import Board, check_win
-from game.ui import UIBuilder
-from typing import Literal, Tuple, List
+from game.background import BackgroundMove
+from typing import Literal, Tuple, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pygame
+    from game.ui import UIBuilder
+
+def load_pygame():
+    # - pygame and the UI are only imported for the windowed game, simulate_games and worker processes never load them
+    global pygame, UIBuilder
+    import pygame
+    from game.ui import UIBuilder
 
 # - ------------------------------------------------------------------------------------------------------------------------------------------------------
 # - The required package for Gemini is already specified in requirements.txt
@@ -99,11 +110,30 @@ def show_play_again_buttons(screen: pygame.Surface) -> Tuple[pygame.Rect, pygame
     pygame.display.update()
     return play_rect, exit_rect
 
-def get_random_column(board: Board) -> int:
+def get_random_column(board: Board, rng=random) -> int:
+    # - Pass a random.Random(seed) as rng to make a game reproducible
     valid_moves = [c for c in range(board.columns) if board.is_valid_move(c)]
     if not valid_moves:
       raise Exception("No valid moves, cannot get random column")
-    return random.choice(valid_moves)
+    return rng.choice(valid_moves)
+
+def wait_for_ai_move(ui: UIBuilder, screen: pygame.Surface, text: str, compute, cancel=None, reset=None):
+    # - The move is computed on a background thread while this loop keeps the window responsive
+    #   and animates the thinking text. Closing the window cancels the search and exits
+    # - Returns (result of compute, seconds compute took), timed on the worker thread and not rounded up to frames
+    worker = BackgroundMove(compute, cancel, reset)
+    clock = pygame.time.Clock()
+    frame = 0
+    while not worker.done():
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                worker.cancel()
+                pygame.quit()
+                sys.exit()
+        ui.update_display([ui.draw_thinking(screen, text, frame)])
+        frame += 1
+        clock.tick(30)
+    return worker.result(), worker.seconds
 
 last_mouse_x = None
 def process_human_move(ui: UIBuilder, board: Board, screen: pygame.Surface, turn: int) -> int:
@@ -131,7 +161,8 @@ def process_human_move(ui: UIBuilder, board: Board, screen: pygame.Surface, turn
             if board.is_valid_move(col):
                 return col
 
-def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2player", game_number=1, simulate=False, auto_restart=False):
+def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2player", game_number=1, simulate=False, auto_restart=False, ordering=None, seed=None):
+    load_pygame()
     pygame.init()
     winner = None
     game_start_time = time.time()
@@ -140,8 +171,12 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
         raise Exception("Gemini is disabled but you are in gemini mode. Either enable gemini by setting gemini_enabled to True at the top of this file or change mode")
 
     board = Board()
+    # - Seeded generator for the simulated player and the fallback moves, so a simulated game can be replayed
+    rng = random.Random(seed) if seed is not None else random
     if mode in ["minimax", "alpha-beta"]:
-        minimax_agent = MinimaxAgent(max_depth=5, use_alpha_beta=(mode == "alpha-beta"))
+        minimax_agent = MinimaxAgent(max_depth=5, use_alpha_beta=(mode == "alpha-beta"), ordering=ordering if mode == "alpha-beta" else None)
+    # - The ordering policy goes into the logged agent name so node counts can be compared per policy
+    log_label = f"{mode}+{ordering}" if mode == "alpha-beta" and ordering is not None else mode
     turn = 0
     fallback_used = False  # Reset fallback tracking for each new game
 
@@ -161,41 +196,32 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
 
         if current_player == 1:
             if simulate:
-                col = get_random_column(board)
+                col = get_random_column(board, rng)
             else:
                 col = process_human_move(ui, board, screen, turn)
         else:
             if mode == "gemini":
-                display_text(screen, f"Gemini Thinking...", (255, 255, 255))
-                pygame.time.wait(500) 
-                start_time = time.time()
-                col = get_move_from_gemini(board, game_number)
-                duration = time.time() - start_time
+                col, duration = wait_for_ai_move(ui, screen, "Gemini Thinking", lambda: get_move_from_gemini(board, game_number))
                 if col is None:
                     print("AI could not find a valid move. Choosing a random valid column.")
                     fallback_used = True
-                    col = get_random_column(board)
+                    col = get_random_column(board, rng)
                 nodes = "N/A"
                 if LOG_RESULTS:
-                    with open(CSV_FILENAME, mode='a', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow([game_number, turn, "gemini", col, f"{duration:.4f}", nodes])
+                    get_run_logger().log_move([game_number, turn, "gemini", col, f"{duration:.4f}", nodes])
             elif mode in ["minimax", "alpha-beta"]:
                 agent_label = "Minimax" if mode == "minimax" else "Alpha-Beta"
-                display_text(screen, f"{agent_label} Thinking...", (255, 255, 255))
                 game_state = initialize_board(board, 2)
-                start_time = time.time()
-                col, nodes = minimax_agent.get_move(game_state)
+                (col, nodes), duration = wait_for_ai_move(ui, screen, f"{agent_label} Thinking",
+                                                          lambda: minimax_agent.get_move(game_state),
+                                                          minimax_agent.cancel, minimax_agent.reset_cancel)
                 if col is None:
                     print("AI could not find a valid move. Choosing a random valid column.")
                     fallback_used = True
-                    col = get_random_column(board)
-                duration = time.time() - start_time
+                    col = get_random_column(board, rng)
                 print(f"AI selected column {col} in {duration:.4f} seconds, nodes evaluated: {nodes}")
                 if LOG_RESULTS:
-                    with open(CSV_FILENAME, mode='a', newline='') as file:
-                        writer = csv.writer(file)
-                        writer.writerow([game_number, turn, mode, col, f"{duration:.4f}", nodes])
+                    get_run_logger().log_move([game_number, turn, log_label, col, f"{duration:.4f}", nodes])
             else:
                 raise Exception("No valid mode")
 
@@ -229,23 +255,21 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
                 else:
                     player_result = "Tie"
                     agent_result = "Tie"
-                with open("game_result.csv", mode='a', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow([
-                        game_number,
-                        mode,
-                        player_result,
-                        agent_result,
-                        1 if winner == 1 else 0,
-                        1 if winner == 2 else 0,
-                        f"{game_duration:.2f}",
-                        1 if simulate else 0
-                    ])
+                get_run_logger().log_game([
+                    game_number,
+                    log_label,
+                    player_result,
+                    agent_result,
+                    1 if winner == 1 else 0,
+                    1 if winner == 2 else 0,
+                    f"{game_duration:.2f}",
+                    1 if simulate else 0
+                ])
         else:
+            # - Only the top strip (thinking text) and the new piece's cell changed
             ui.draw_top_background(screen)
-            ui.draw_background(screen)
-            ui.draw_board(screen)
-            ui.update_display()
+            cell_rect = ui.draw_cell(screen, row, col)
+            ui.update_display([pygame.Rect(0, 0, ui.width, ui.circle_size), cell_rect])
 
         turn += 1
 
@@ -265,6 +289,8 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
                         sys.exit()
                     if event.type == pygame.MOUSEBUTTONDOWN and play_again_button.collidepoint(event.pos):
                         board.reset_board()
+                        if mode in ["minimax", "alpha-beta"]:
+                            minimax_agent.new_game()
                         turn = 0
                         game_over = False
                         ui.draw_background(screen)
@@ -272,6 +298,9 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
                         ui.update_display()
                         break
 
+    if mode in ["minimax", "alpha-beta"]:
+        minimax_agent.close()
+
     if not simulate:
         return game_number
     elif simulate and auto_restart:
@@ -279,41 +308,27 @@ def pygame_game(mode: Literal["2player", "minimax", "alpha-beta", "gemini"] = "2
     else:
         return game_number
 
-def simulate_games(mode: Literal["minimax", "alpha-beta"], games: int = 10):
+def simulate_games(mode: Literal["minimax", "alpha-beta"], games: int = 10, max_depth: int = 5, game_number: int = 1, seed=None):
+    # - Headless: runs on simulation.py, so no window is opened and nothing is animated
+    minimax_agent = MinimaxAgent(max_depth=max_depth, use_alpha_beta=(mode == "alpha-beta"), verbose=False)
+    records = run_games(RandomAgent(seed), minimax_agent, games, game_number)
+    if LOG_RESULTS:
+        records = write_records(records, get_run_logger(), log_moves_of=mode)
     wins = {1: 0, 2: 0}
-    for i in range(games):
-        board = Board()
-        minimax_agent = MinimaxAgent(max_depth=5, use_alpha_beta=(mode == "alpha-beta"))
-        turn = 0
-        while True:
-            current_player = 1 if turn % 2 == 0 else 2
-            if current_player == 2:
-                state = initialize_board(board, 2)
-                col, _ = minimax_agent.get_move(state)
-            else:
-                col = get_random_column(board)
-            row = board.get_next_open_row(col)
-            if row is None:
-                break
-            board.drop_piece(row, col, current_player)
-            if check_win(board, current_player):
-                wins[current_player] += 1
-                break
-            turn += 1
+    for kind, row in records:
+        if kind == "game":
+            wins[1] += row[4]
+            wins[2] += row[5]
+    minimax_agent.close()
     print(f"{mode} AI win rate over {games} games: {wins[2]} / {games}")
+    return game_number + games
 
 game_number = get_last_game_number(CSV_FILENAME)
 
 if __name__ == "__main__":
     if LOG_RESULTS:
-        if not os.path.exists(CSV_FILENAME):
-            with open(CSV_FILENAME, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["Game", "Turn", "Agent", "Move", "Time(s)", "Nodes"])
-        if not os.path.exists("game_result.csv"):
-            with open("game_result.csv", mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["GameNum", "AgentUsed", "PlayerResult", "AgentResult", "PlayerScore", "AgentScore", "GameTime", "Simulated"])
+        # - Opens both logs for the run and writes the headers if the files are new
+        get_run_logger()
 
     # -----------------------
     # Manual Testing Section
@@ -346,6 +361,9 @@ if __name__ == "__main__":
     for _ in range(num_of_games):
         game_number = pygame_game("alpha-beta", game_number=game_number, simulate=True, auto_restart=True)
 
+    # Simulate multiple games headless (no window, no animations) using Alpha-Beta AI vs Random Player
+    #game_number = simulate_games("alpha-beta", games=num_of_games, max_depth=5, game_number=game_number)
+
     # Simulate multiple games using Gemini AI vs Random Player
     # for _ in range(num_of_games):
     #     game_number = pygame_game("gemini", game_number=game_number, simulate=True, auto_restart=True)
@@ -1,3 +1,5 @@
+# For logs too large to load in full (or logs in the columnar .c4col format), log_analysis.py
+# computes the same per-agent summaries chunk by chunk in bounded memory
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
@@ -16,9 +18,7 @@ if 'Nodes1' in df_moves.columns:
 df_moves["Time(s)"] = pd.to_numeric(df_moves["Time(s)"], errors="coerce")
 df_moves["Nodes"] = pd.to_numeric(df_moves["Nodes"], errors="coerce")
 
-# Adjust move time for Gemini moves: subtract 12 seconds for each Gemini move
-df_moves.loc[df_moves["AgentUsed"].str.lower() == "gemini", "Time(s)"] = \
-    df_moves.loc[df_moves["AgentUsed"].str.lower() == "gemini", "Time(s)"] - 12
+# Gemini move times are used as logged, they are the time spent on the Gemini calls of the move
 
 # Move-Level Summary: Average Time and Nodes per Agent
 print("=== Move-Level Summary ===")
@@ -38,7 +38,7 @@ agent_colors = {agent: cmap(i) for i, agent in enumerate(agents)}
 plt.figure(figsize=(8, 5))
 plt.bar(move_summary.index, move_summary["Time(s)"],
         color=[agent_colors[agent] for agent in move_summary.index])
-plt.title("Avg Time per Move by Agent (Adjusted)")
+plt.title("Avg Time per Move by Agent")
 plt.ylabel("Time (s)")
 plt.xlabel("Agent")
 plt.tight_layout()
@@ -64,20 +64,6 @@ print("\n=== Game-Level Summary ===")
 game_summary = df_games["AgentResult"].value_counts()
 print(game_summary)
 
-# Adjust game time for Gemini games:
-# For each game played by Gemini, subtract 12 seconds for every Gemini move in that game.
-# (Assumes the game identifier is stored in the "GameNum" column.)
-gemini_move_counts = df_moves[df_moves["AgentUsed"].str.lower() == "gemini"].groupby("GameNum").size()
-
-def adjust_game_time(row):
-    if row["AgentUsed"].strip().lower() == "gemini":
-        count = gemini_move_counts.get(row["GameNum"], 0)
-        return row["GameTime"] - 12 * count
-    else:
-        return row["GameTime"]
-
-df_games["AdjustedGameTime"] = df_games.apply(adjust_game_time, axis=1)
-
 # -------------------------------
 # Plotting Game-Level Graphs
 # -------------------------------
@@ -89,12 +75,12 @@ plt.title("AI Game Results")
 plt.tight_layout()
 plt.show()
 
-# Avg Game Time by Agent (Bar Chart) using the adjusted game times
+# Avg Game Time by Agent (Bar Chart)
 plt.figure(figsize=(8, 5))
-avg_game_time = df_games.groupby("AgentUsed")["AdjustedGameTime"].mean()
+avg_game_time = df_games.groupby("AgentUsed")["GameTime"].mean()
 plt.bar(avg_game_time.index, avg_game_time,
         color=[agent_colors.get(agent, cmap(0)) for agent in avg_game_time.index])
-plt.title("Avg Game Time by Agent (Adjusted)")
+plt.title("Avg Game Time by Agent")
 plt.ylabel("Game Time (s)")
 plt.xlabel("Agent")
 plt.tight_layout()
@@ -117,13 +103,13 @@ plt.tight_layout()
 plt.show()
 
 
-# Histogram: Distribution of Game Times for Each Agent (Adjusted)
+# Histogram: Distribution of Game Times for Each Agent
 plt.figure(figsize=(8, 5))
 for agent in agents:
-    agent_game_time = df_games[df_games["AgentUsed"] == agent]["AdjustedGameTime"]
+    agent_game_time = df_games[df_games["AgentUsed"] == agent]["GameTime"]
     plt.hist(agent_game_time, bins=20, alpha=0.5, label=agent,
              color=agent_colors.get(agent, cmap(0)))
-plt.title("Histogram of Game Times by Agent (Adjusted)")
+plt.title("Histogram of Game Times by Agent")
 plt.xlabel("Game Time (s)")
 plt.ylabel("Frequency")
 plt.legend(title="Agent")
@@ -0,0 +1,233 @@
+""" self_play.py
+ - This file contains the self-play pipeline that produces labelled positions, e.g. to tune the check_window weights
+    - Games are played between MinimaxAgent configurations (the agent dicts of tournament.py) in a process pool.
+      Both players are picked at random for every game and the first random_plies moves are random, so games differ
+    - Every position before a move is labelled by a deeper negamax search (the labeler): its score from player 1's view
+      and its best move. The game result is added once the game is over
+    - Records stream into sharded, append-only files of fixed-size records (game.position_log), read back through mmap
+    - Every game gets its own seed (tournament.game_seed) and the agents start every game with empty tables, so a game
+      is the same whichever worker plays it
+    - Games are handed to the pool in batches of batch_games. After each batch the shard is synced to disk and the
+      checkpoint (progress.json: next game, shard and its size, run settings) is replaced atomically. Nothing else is
+      kept between batches, so memory stays constant however long the run is
+    - Resuming: running the same command again cuts the shards back to the checkpoint and goes on with the next game.
+      Games of a batch that was interrupted are played again, a run with other settings in the same directory is refused
+    - Run from the repository root (Ctrl+C to stop, games=None runs until stopped):
+        python self_play.py --out selfplay --games 10000 --depth 8
+"""
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from connect_four import initialize_board, get_valid_moves, MinimaxAgent
+from game.board import Board, check_win_at
+from game.bitboard import BitBoard
+from game.ordering import make_ordering
+from game.position_log import ShardWriter, NO_MOVE, list_shards, shard_path, truncate_to, read_positions
+from tournament import build_agent, game_seed
+
+FAST = {"use_alpha_beta": True, "use_bitboard": True, "in_place": True, "incremental_eval": True,
+        "use_transposition": True, "tt_size": 1 << 16, "ordering": "all"}
+
+DEFAULT_PLAYERS = [
+    dict(FAST, name="ab-2", type="minimax", max_depth=2),
+    dict(FAST, name="ab-4", type="minimax", max_depth=4),
+    dict(FAST, name="ab-6", type="minimax", max_depth=6),
+]
+# - MinimaxAgent options of the labeler, it has to be the negamax search: the score is read from last_score
+DEFAULT_LABELER = dict(FAST, max_depth=8, use_negamax=True)
+
+CHECKPOINT = "progress.json"
+
+# - Agents of this worker process, one per configuration, reused from game to game
+worker_agents = {}
+
+def get_worker_agent(config: Dict, seed: int):
+    if config.get("type") == "random":
+        # - Cheap to build, and a new one per game keeps its moves tied to the game's seed
+        return build_agent(config, seed)
+    key = json.dumps(config, sort_keys=True)
+    agent = worker_agents.get(key)
+    if agent is None:
+        agent = build_agent(config, seed) if "type" in config else MinimaxAgent(**config)
+        worker_agents[key] = agent
+    # - Empty tables and move ordering history for every game, otherwise the moves and labels would depend on
+    #   the games this worker played before
+    agent.new_game()
+    agent.ordering = make_ordering(agent.ordering_policy)
+    return agent
+
+def label_position(labeler: MinimaxAgent, state) -> Tuple[float, Optional[int]]:
+    move, _ = labeler.get_move(state)
+    if labeler.last_source == "solved":
+        # - The solver's value is for the player to move, the records keep player 1's view
+        sign = 1 if state['current_player'] == 1 else -1
+        return (sign * labeler.last_solved * math.inf if labeler.last_solved else 0.0), move
+    return labeler.last_score, move
+
+def play_labelled_game(task) -> Tuple[int, List[Tuple]]:
+    game_number, players, labeler_options, random_plies, run_seed, (rows, columns, connect) = task
+    seed = game_seed(run_seed, game_number)
+    rng = random.Random(seed)
+    agents = {1: get_worker_agent(rng.choice(players), seed), 2: None}
+    agents[2] = get_worker_agent(rng.choice(players), seed + 1) if len(players) > 1 else agents[1]
+    labeler = get_worker_agent(labeler_options, seed)
+
+    board = Board(rows, columns, connect=connect)
+    bitboard = BitBoard(rows, columns, connect)
+    positions = []
+    winner = None
+    for ply in range(rows * columns):
+        player = 1 if ply % 2 == 0 else 2
+        score, best_move = label_position(labeler, initialize_board(board, player))
+        positions.append((bitboard.masks[0], bitboard.masks[1], score, player, ply, best_move))
+
+        state = initialize_board(board, player)
+        if ply < random_plies:
+            col = rng.choice(get_valid_moves(state))
+        else:
+            col, _ = agents[player].get_move(state)
+            if col is None or not board.is_valid_move(col):
+                col = rng.choice(get_valid_moves(state))
+        row = board.get_next_open_row(col)
+        board.drop_piece(row, col, player)
+        bitboard.drop(col, player)
+        if check_win_at(board, row, col, player):
+            winner = player
+            break
+
+    depth = labeler.max_depth
+    records = []
+    for player_one, player_two, score, player, ply, best_move in positions:
+        result = 0 if winner is None else 1 if winner == player else -1
+        records.append((player_one, player_two, score, game_number, player, ply,
+                        NO_MOVE if best_move is None else best_move, depth, result))
+    return game_number, records
+
+def read_checkpoint(directory: str) -> Optional[Dict]:
+    try:
+        with open(os.path.join(directory, CHECKPOINT), mode='r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def write_checkpoint(directory: str, checkpoint: Dict):
+    # - Same as game.run_log: write a temporary file and replace, a crash never leaves half a checkpoint
+    path = os.path.join(directory, CHECKPOINT)
+    with open(path + ".tmp", mode='w') as file:
+        json.dump(checkpoint, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(path + ".tmp", path)
+
+def restore(directory: str, settings: Dict) -> Tuple[int, int, int]:
+    # - Returns (next game, shard, positions so far) and drops everything written after the checkpoint
+    checkpoint = read_checkpoint(directory)
+    if checkpoint is None:
+        if list_shards(directory):
+            raise ValueError(f"{directory} has shards but no {CHECKPOINT}, use an empty directory")
+        return 0, 0, 0
+    if checkpoint["settings"] != settings:
+        raise ValueError(f"{directory} was written with other settings: {checkpoint['settings']}")
+    shard = checkpoint["shard"]
+    truncate_to(shard_path(directory, shard), checkpoint["size"])
+    for path in list_shards(directory):
+        if path > shard_path(directory, shard):
+            os.remove(path)
+    return checkpoint["next_game"], shard, checkpoint["positions"]
+
+def run_self_play(
+    directory: str,
+    games: Optional[int] = None,
+    players: List[Dict] = DEFAULT_PLAYERS,
+    labeler: Dict = DEFAULT_LABELER,
+    processes: Optional[int] = None,
+    random_plies: int = 4,
+    seed: int = 0,
+    geometry: Tuple[int, int, int] = (6, 7, 4),
+    batch_games: int = 64,
+    max_records: int = 1 << 20,
+):
+    if not labeler.get("use_negamax"):
+        raise ValueError("The labeler needs use_negamax=True, its score is read from MinimaxAgent.last_score")
+    if labeler.get("time_limit_ms") is not None:
+        raise ValueError("The labeler needs a fixed depth (no time_limit_ms) so the labels don't depend on the machine")
+    rows, columns, connect = geometry
+    # - Stored in the checkpoint, JSON turns tuples into lists so they are compared as lists
+    settings = json.loads(json.dumps({"players": players, "labeler": labeler, "random_plies": random_plies,
+                                      "seed": seed, "geometry": geometry}))
+    os.makedirs(directory, exist_ok=True)
+    next_game, shard, positions = restore(directory, settings)
+    writer = ShardWriter(directory, rows, columns, connect, max_records, shard)
+    shard, size = writer.flush()
+    write_checkpoint(directory, {"next_game": next_game, "shard": shard, "size": size, "positions": positions,
+                                 "settings": settings})
+    if next_game:
+        print(f"Resuming at game {next_game} ({positions} positions so far)")
+
+    start = time.perf_counter()
+    played = 0
+    try:
+        with multiprocessing.Pool(processes) as pool:
+            while games is None or next_game < games:
+                end = next_game + batch_games if games is None else min(next_game + batch_games, games)
+                tasks = [(game, players, labeler, random_plies, seed, geometry) for game in range(next_game, end)]
+                # - imap keeps game order, so the shards hold the games in order and a checkpoint is a single game number
+                for _, records in pool.imap(play_labelled_game, tasks):
+                    writer.write(records)
+                    positions += len(records)
+                shard, size = writer.flush()
+                write_checkpoint(directory, {"next_game": end, "shard": shard, "size": size, "positions": positions,
+                                             "settings": settings})
+                played += end - next_game
+                next_game = end
+                elapsed = time.perf_counter() - start
+                print(f"{next_game} games, {positions} positions, {played / elapsed:.2f} games/s")
+    except KeyboardInterrupt:
+        print(f"Stopped, run the same command again to resume at game {next_game}")
+    finally:
+        writer.close()
+    return next_game, positions
+
+def summarize_positions(directory: str) -> Dict:
+    # - Streams every record through the memory maps, memory use doesn't depend on the number of positions
+    summary = {"positions": 0, "games": 0, "wins": 0, "draws": 0, "losses": 0, "forced": 0}
+    last_game = None
+    for _, record in read_positions(directory):
+        score, game, result = record[2], record[3], record[8]
+        summary["positions"] += 1
+        if game != last_game:
+            summary["games"] += 1
+            last_game = game
+        summary[{1: "wins", 0: "draws", -1: "losses"}[result]] += 1
+        summary["forced"] += abs(score) == math.inf
+    return summary
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play self-play games and write positions labelled by a deeper search")
+    parser.add_argument("--out", default="selfplay", help="directory of the shards and the checkpoint")
+    parser.add_argument("--games", type=int, default=None, help="stop after this many games (default: run until stopped)")
+    parser.add_argument("--depth", type=int, default=DEFAULT_LABELER["max_depth"], help="depth of the labelling search")
+    parser.add_argument("--random-plies", type=int, default=4, help="random moves at the start of every game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=64, help="games between checkpoints")
+    parser.add_argument("--shard-records", type=int, default=1 << 20, help="records per shard (32 bytes each)")
+    parser.add_argument("--rows", type=int, default=6)
+    parser.add_argument("--columns", type=int, default=7)
+    parser.add_argument("--connect", type=int, default=4)
+    parser.add_argument("--stats", action="store_true", help="only summarize the positions already written")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(summarize_positions(args.out))
+    else:
+        run_self_play(args.out, args.games, labeler=dict(DEFAULT_LABELER, max_depth=args.depth), processes=args.workers,
+                      random_plies=args.random_plies, seed=args.seed, geometry=(args.rows, args.columns, args.connect),
+                      batch_games=args.batch, max_records=args.shard_records)
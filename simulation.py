@@ -0,0 +1,120 @@
+""" simulation.py
+ - This file contains the headless simulation engine used to play many games between two agents
+    - It only uses connect_four and game.board, pygame is never imported, so nothing is drawn and nothing waits
+    - play_game plays one game and yields a record for every move and one for the finished game
+    - run_games plays N games in a row and streams the records of all of them
+    - rows, columns and connect set the board, e.g. 7x8 or connect-5 (default 6x7 Connect 4)
+    - write_records passes the records to a game.run_log.RunLogger (buffered writes to performance_log.csv and game_result.csv)
+    - Move records use the columns of performance_log.csv: GameNum, Turn, AgentUsed, Move, Time(s), Nodes
+    - Game records use the columns of game_result.csv: GameNum, AgentUsed, PlayerResult, AgentResult,
+      PlayerScore, AgentScore, GameTime, Simulated (player = player 1, agent = player 2, like main.py)
+"""
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from connect_four import initialize_board, ConnectFourAgent, MinimaxAgent, RandomAgent
+from game.board import Board, check_win_at
+from game.run_log import RunLogger
+
+def agent_label(agent: ConnectFourAgent) -> str:
+    # - Same names as the modes of main.pygame_game, so the logs can be mixed
+    if isinstance(agent, MinimaxAgent):
+        label = "alpha-beta" if agent.use_alpha_beta else "minimax"
+        if agent.ordering_policy is not None:
+            label += f"+{agent.ordering_policy}"
+        return label
+    if isinstance(agent, RandomAgent):
+        return "random"
+    return type(agent).__name__
+
+def play_game(
+    agent_one: ConnectFourAgent,
+    agent_two: ConnectFourAgent,
+    game_number: int = 1,
+    label_one: Optional[str] = None,
+    label_two: Optional[str] = None,
+    fallback: Optional[RandomAgent] = None,
+    rows: int = 6,
+    columns: int = 7,
+    connect: int = 4,
+) -> Iterator[Tuple[str, List]]:
+    board = Board(rows, columns, connect=connect)
+    agents = {1: agent_one, 2: agent_two}
+    labels = {1: label_one or agent_label(agent_one), 2: label_two or agent_label(agent_two)}
+    fallback = fallback or RandomAgent(game_number)
+    winner = None
+    game_start_time = time.perf_counter()
+
+    for turn in range(board.rows * board.columns):
+        player = 1 if turn % 2 == 0 else 2
+        state = initialize_board(board, player)
+        start_time = time.perf_counter()
+        col, nodes = agents[player].get_move(state)
+        duration = time.perf_counter() - start_time
+        if col is None or not board.is_valid_move(col):
+            # - Same fallback as main.py when an agent has no valid move, without the on-screen message
+            col, _ = fallback.get_move(state)
+
+        row = board.get_next_open_row(col)
+        board.drop_piece(row, col, player)
+        yield "move", [game_number, turn, labels[player], col, f"{duration:.4f}", nodes]
+
+        if check_win_at(board, row, col, player):
+            winner = player
+            break
+
+    game_duration = time.perf_counter() - game_start_time
+    if winner == 1:
+        player_result, agent_result = "Win", "Loss"
+    elif winner == 2:
+        player_result, agent_result = "Loss", "Win"
+    else:
+        player_result, agent_result = "Tie", "Tie"
+    yield "game", [
+        game_number,
+        labels[2],
+        player_result,
+        agent_result,
+        1 if winner == 1 else 0,
+        1 if winner == 2 else 0,
+        f"{game_duration:.2f}",
+        1,
+    ]
+
+def run_games(
+    agent_one: ConnectFourAgent,
+    agent_two: ConnectFourAgent,
+    games: int = 10,
+    start_game_number: int = 1,
+    label_one: Optional[str] = None,
+    label_two: Optional[str] = None,
+    rows: int = 6,
+    columns: int = 7,
+    connect: int = 4,
+) -> Iterator[Tuple[str, List]]:
+    for game_number in range(start_game_number, start_game_number + games):
+        for agent in (agent_one, agent_two):
+            if hasattr(agent, "new_game"):
+                agent.new_game()
+        yield from play_game(agent_one, agent_two, game_number, label_one, label_two,
+                             rows=rows, columns=columns, connect=connect)
+
+def write_records(records: Iterator[Tuple[str, List]], logger: Optional[RunLogger] = None,
+                  log_moves_of: Optional[str] = None) -> Iterator[Tuple[str, List]]:
+    # - Logs every record as it passes through and yields it on, so callers can still count results
+    # - logger: defaults to a RunLogger on performance_log.csv and game_result.csv, closed once the records run out
+    # - log_moves_of: only log the moves of this agent label (main.py only logs the AI's moves)
+    own_logger = logger is None
+    if own_logger:
+        logger = RunLogger()
+    try:
+        for kind, row in records:
+            if kind == "move":
+                if log_moves_of is None or row[2] == log_moves_of:
+                    logger.log_move(row)
+            else:
+                logger.log_game(row)
+            yield kind, row
+    finally:
+        if own_logger:
+            logger.close()
@@ -0,0 +1,136 @@
+""" tournament.py
+ - This file contains the tournament runner for agent-vs-agent matches across a process pool
+    - Agents are described by configuration dicts so they can be sent to worker processes, e.g.
+        {"name": "random", "type": "random"}
+        {"name": "minimax-4", "type": "minimax", "max_depth": 4}
+        {"name": "ab-6-center", "type": "minimax", "max_depth": 6, "use_alpha_beta": True, "ordering": "center"}
+      Every key other than name and type is passed to MinimaxAgent
+    - schedule_round_robin pairs every agent with every other agent, schedule_gauntlet pairs one challenger with all the others
+    - Each pairing is played in both colours, every game gets its own seed (derived from the tournament seed and
+      the game index) for the random agent and the fallback move, so any game can be replayed on its own
+    - run_tournament plays the games in a multiprocessing pool (games are independent) and aggregates
+      win/draw/loss, nodes and time per pairing, from the point of view of the first agent of the pairing
+    - geometry (rows, columns, connect) sets the board every game is played on, e.g. (7, 8, 4) or (6, 7, 5)
+    - Runs headless through simulation.play_game, pygame is never imported
+"""
+import multiprocessing
+import random
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from connect_four import MinimaxAgent, RandomAgent
+from simulation import play_game
+
+def build_agent(config: Dict, seed: int):
+    options = {key: value for key, value in config.items() if key not in ("name", "type")}
+    if config["type"] == "random":
+        return RandomAgent(seed)
+    if config["type"] == "minimax":
+        options.setdefault("verbose", False)
+        return MinimaxAgent(**options)
+    raise ValueError(f"Unknown agent type '{config['type']}'. Use 'random' or 'minimax'.")
+
+def game_seed(tournament_seed: int, game_index: int) -> int:
+    # - Independent of scheduling order and of which worker plays the game
+    return random.Random(f"{tournament_seed}:{game_index}").getrandbits(32)
+
+def schedule_round_robin(agents: List[Dict], games_per_pairing: int = 2) -> List[Tuple[Dict, Dict, bool]]:
+    pairings = []
+    for i in range(len(agents)):
+        for j in range(i + 1, len(agents)):
+            pairings.append((agents[i], agents[j]))
+    return schedule_games(pairings, games_per_pairing)
+
+def schedule_gauntlet(challenger: Dict, opponents: List[Dict], games_per_pairing: int = 2) -> List[Tuple[Dict, Dict, bool]]:
+    return schedule_games([(challenger, opponent) for opponent in opponents], games_per_pairing)
+
+def schedule_games(pairings: List[Tuple[Dict, Dict]], games_per_pairing: int) -> List[Tuple[Dict, Dict, bool]]:
+    # - Returns (first, second, swapped) per game, colours alternate so each agent moves first in half of the games
+    games = []
+    for first, second in pairings:
+        for game in range(games_per_pairing):
+            games.append((first, second, game % 2 == 1))
+    return games
+
+def play_scheduled_game(task: Tuple) -> Dict:
+    game_index, first, second, swapped, tournament_seed, (rows, columns, connect) = task
+    seed = game_seed(tournament_seed, game_index)
+    agent_first = build_agent(first, seed)
+    agent_second = build_agent(second, seed + 1)
+    player_one, player_two = (agent_second, agent_first) if swapped else (agent_first, agent_second)
+    label_one, label_two = (second["name"], first["name"]) if swapped else (first["name"], second["name"])
+
+    nodes = {1: 0, 2: 0}
+    time_spent = {1: 0.0, 2: 0.0}
+    moves = {1: 0, 2: 0}
+    winner = None
+    fallback = RandomAgent(seed + 2)
+    for kind, row in play_game(player_one, player_two, game_index, label_one, label_two, fallback, rows, columns, connect):
+        if kind == "move":
+            player = 1 if row[1] % 2 == 0 else 2
+            nodes[player] += row[5] if isinstance(row[5], int) else 0
+            time_spent[player] += float(row[4])
+            moves[player] += 1
+        else:
+            winner = 1 if row[4] else 2 if row[5] else None
+    for agent in (agent_first, agent_second):
+        if isinstance(agent, MinimaxAgent):
+            agent.close()
+
+    first_player = 2 if swapped else 1
+    return {
+        "game": game_index,
+        "seed": seed,
+        "pairing": (first["name"], second["name"]),
+        "first_moved_first": not swapped,
+        "result": "draw" if winner is None else "win" if winner == first_player else "loss",
+        "nodes": (nodes[first_player], nodes[3 - first_player]),
+        "time": (time_spent[first_player], time_spent[3 - first_player]),
+        "moves": (moves[first_player], moves[3 - first_player]),
+    }
+
+def run_tournament(
+    games: List[Tuple[Dict, Dict, bool]],
+    processes: Optional[int] = None,
+    seed: int = 0,
+    geometry: Tuple[int, int, int] = (6, 7, 4),
+) -> Iterator[Dict]:
+    # - Streams one result per finished game, in completion order
+    tasks = [(index, first, second, swapped, seed, geometry) for index, (first, second, swapped) in enumerate(games)]
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(play_scheduled_game, tasks, chunksize=1)
+
+def summarize(results) -> Dict[Tuple[str, str], Dict]:
+    summary: Dict[Tuple[str, str], Dict] = {}
+    for result in results:
+        entry = summary.setdefault(result["pairing"], {
+            "games": 0, "wins": 0, "draws": 0, "losses": 0,
+            "nodes": [0, 0], "time": [0.0, 0.0], "moves": [0, 0],
+        })
+        entry["games"] += 1
+        entry[{"win": "wins", "draw": "draws", "loss": "losses"}[result["result"]]] += 1
+        for side in (0, 1):
+            entry["nodes"][side] += result["nodes"][side]
+            entry["time"][side] += result["time"][side]
+            entry["moves"][side] += result["moves"][side]
+    return summary
+
+def print_summary(summary: Dict[Tuple[str, str], Dict]):
+    print(f"{'Pairing':<40} {'W':>5} {'D':>5} {'L':>5} {'Nodes/move':>22} {'Time/move (s)':>22}")
+    for (first, second), entry in sorted(summary.items()):
+        nodes = [entry["nodes"][side] / max(1, entry["moves"][side]) for side in (0, 1)]
+        times = [entry["time"][side] / max(1, entry["moves"][side]) for side in (0, 1)]
+        print(f"{first + ' vs ' + second:<40} {entry['wins']:>5} {entry['draws']:>5} {entry['losses']:>5} "
+              f"{nodes[0]:>10.0f} /{nodes[1]:>10.0f} {times[0]:>10.4f} /{times[1]:>10.4f}")
+
+if __name__ == "__main__":
+    agents = [
+        {"name": "random", "type": "random"},
+        {"name": "minimax-3", "type": "minimax", "max_depth": 3},
+        {"name": "alpha-beta-5", "type": "minimax", "max_depth": 5, "use_alpha_beta": True,
+         "in_place": True, "use_bitboard": True, "incremental_eval": True, "ordering": "center"},
+    ]
+    start = time.perf_counter()
+    summary = summarize(run_tournament(schedule_round_robin(agents, games_per_pairing=10), seed=468))
+    print_summary(summary)
+    print(f"Finished in {time.perf_counter() - start:.1f}s")